@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CrmConfig(AppConfig):
+    name = 'crm'
+
+    def ready(self):
+        # Register cache invalidation receivers
+        from . import signals  # noqa: F401
+        # Register the per-connection database setup
+        from . import db  # noqa: F401
@@ -0,0 +1,12 @@
+"""
+ASGI entry point, e.g. `uvicorn crm.asgi:application --workers 2`.
+/graphql is served by AsyncCRMGraphQLView here (see CRM_ASYNC_GRAPHQL).
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm.settings')
+os.environ.setdefault('CRM_ASYNC_GRAPHQL', '1')
+
+application = get_asgi_application()
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from graphql import ExecutionContext
+from graphql.pyutils import Path, Undefined
+
+from .metrics import instrument_connection
+from .query_patterns import watch_connection
+from .response_cache import track_connection
+
+
+# ============================
+# ORM THREAD POOL
+# ============================
+# Async requests never touch the ORM on the event loop. Their database work
+# runs on this pool, whose size bounds the connections they hold open.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def orm_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "CRM_ASYNC_ORM_WORKERS", 8),
+                thread_name_prefix="crm-orm",
+            )
+    return _executor
+
+
+def _as_request(func):
+    def run(*args, **kwargs):
+        # Pool threads sit outside Django's request cycle, so expire their
+        # connection the way request_started/request_finished would
+        close_old_connections()
+        try:
+            with track_connection(), instrument_connection(), watch_connection():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return run
+
+
+def run_orm(func, *args, **kwargs):
+    """Awaitable running the sync callable on the ORM pool, in a copy of the caller's context."""
+    return sync_to_async(_as_request(func), thread_sensitive=False, executor=orm_executor())(*args, **kwargs)
+
+
+# ============================
+# EXECUTION
+# ============================
+class ConcurrentExecutionContext(ExecutionContext):
+    """
+    Resolves each root field of a query, with its whole subtree, on the ORM
+    pool, so independent root fields (allCustomers, allOrders, crmStats, ...)
+    run concurrently. Below the root, resolution stays synchronous inside the
+    field's thread. Mutations don't come through here: their root fields run
+    serially and graphql-core never calls execute_fields() for them.
+    """
+
+    def execute_fields(self, parent_type, source_value, path, fields):
+        if path is not None:
+            return super().execute_fields(parent_type, source_value, path, fields)
+
+        names = list(fields)
+        pending = [
+            run_orm(self.execute_field, parent_type, source_value, fields[name], Path(None, name, parent_type.name))
+            for name in names
+        ]
+
+        async def gather():
+            values = await asyncio.gather(*pending)
+            return {name: value for name, value in zip(names, values) if value is not Undefined}
+
+        return gather()
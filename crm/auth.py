@@ -0,0 +1,18 @@
+import hmac
+
+from django.http import HttpResponse
+
+
+def staff_or_bearer(request, token):
+    """True for staff users and for requests sending `Authorization: Bearer <token>` (when `token` is set)."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return bool(token) and scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), token.encode())
+
+
+def unauthorized(realm):
+    response = HttpResponse("Authentication required.", status=401, content_type="text/plain")
+    response["WWW-Authenticate"] = f'Bearer realm="{realm}"'
+    return response
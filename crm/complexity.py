@@ -0,0 +1,154 @@
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    get_named_type,
+    get_nullable_type,
+    get_operation_ast,
+    is_composite_type,
+    is_list_type,
+    is_object_type,
+)
+from graphql.execution.values import get_argument_values
+
+
+# Fields that cost more than their shape suggests (aggregates, COUNT queries)
+DEFAULT_FIELD_WEIGHTS = {
+    "Query.crmStats": 10,
+    "CustomerTypeConnection.totalCount": 5,
+    "ProductTypeConnection.totalCount": 5,
+    "OrderTypeConnection.totalCount": 5,
+}
+
+
+class QueryTooExpensive(GraphQLError):
+    pass
+
+
+def _is_connection(graphql_type):
+    return is_object_type(graphql_type) and {"edges", "pageInfo"} <= set(graphql_type.fields)
+
+
+class CostAnalyzer:
+    """
+    Static cost of an operation, computed from the document and variables before execution.
+    Every object or list field costs its weight (1 by default, scalars 0) plus its
+    children's cost multiplied by the page size: `first`/`last` for connection
+    edges, CRM_QUERY_DEFAULT_LIST_SIZE for unbounded lists and connections.
+    Relay edges/node wrappers don't add depth.
+    """
+
+    def __init__(self, schema, document, variables=None, weights=None, default_list_size=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if definition.kind == "fragment_definition"
+        }
+        self.document = document
+        self.weights = {**DEFAULT_FIELD_WEIGHTS, **(weights or {})}
+        self.default_list_size = default_list_size or graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 100
+
+    def analyze(self, operation_name=None):
+        """Returns (cost, depth) for the selected operation."""
+        operation = get_operation_ast(self.document, operation_name)
+        if operation is None:
+            return 0, 0
+        root_type = self.schema.get_root_type(operation.operation)
+        return self._selection_set(operation.selection_set, root_type, 0)
+
+    def _selection_set(self, selection_set, parent_type, depth, page_size=1):
+        cost = 0
+        max_depth = depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self._field(selection, parent_type, depth, page_size)
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    fragment = self.fragments.get(selection.name.value)
+                    if fragment is None:
+                        continue
+                else:
+                    fragment = selection
+                type_condition = fragment.type_condition
+                fragment_type = (
+                    self.schema.get_type(type_condition.name.value) if type_condition else parent_type
+                )
+                field_cost, field_depth = self._selection_set(
+                    fragment.selection_set, fragment_type, depth, page_size
+                )
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def _field(self, node, parent_type, depth, page_size=1):
+        name = node.name.value
+        fields = getattr(parent_type, "fields", None) or {}
+        field = fields.get(name)
+        if field is None or name.startswith("__"):
+            return 0, depth
+
+        return_type = get_nullable_type(field.type)
+        named_type = get_named_type(return_type)
+        weight = self.weights.get(f"{parent_type.name}.{name}", 1 if is_composite_type(named_type) else 0)
+        if node.selection_set is None:
+            return weight, depth
+
+        try:
+            args = get_argument_values(field, node, self.variables)
+        except GraphQLError:
+            args = {}
+
+        edges = _is_connection(parent_type) and name == "edges"
+        wrapper = edges or (parent_type.name.endswith("Edge") and name == "node")
+        child_depth = depth if wrapper else depth + 1
+
+        # A connection's page size multiplies only what sits under its edges
+        child_page_size = 1
+        if edges:
+            multiplier = page_size
+        elif _is_connection(named_type):
+            multiplier = 1
+            child_page_size = args.get("first") or args.get("last") or self.default_list_size
+        elif is_list_type(return_type):
+            multiplier = self.default_list_size
+        else:
+            multiplier = 1
+
+        child_cost, max_depth = self._selection_set(
+            node.selection_set, named_type, child_depth, child_page_size
+        )
+        return weight + multiplier * child_cost, max_depth
+
+
+def check_query_cost(schema, document, operation_name=None, variables=None):
+    """
+    Returns the cost report for the operation, or raises QueryTooExpensive
+    (with the report in its extensions) when it exceeds the configured limits.
+    """
+    max_cost = getattr(settings, "CRM_QUERY_MAX_COST", 10000)
+    max_depth = getattr(settings, "CRM_QUERY_MAX_DEPTH", 8)
+    analyzer = CostAnalyzer(
+        schema,
+        document,
+        variables,
+        weights=getattr(settings, "CRM_QUERY_FIELD_WEIGHTS", None),
+        default_list_size=getattr(settings, "CRM_QUERY_DEFAULT_LIST_SIZE", None),
+    )
+    cost, depth = analyzer.analyze(operation_name)
+    report = {"cost": cost, "maxCost": max_cost, "depth": depth, "maxDepth": max_depth}
+
+    if depth > max_depth:
+        raise QueryTooExpensive(
+            f"Query depth {depth} exceeds the maximum depth of {max_depth}.",
+            extensions={"code": "QUERY_TOO_DEEP", **report},
+        )
+    if cost > max_cost:
+        raise QueryTooExpensive(
+            f"Query cost {cost} exceeds the maximum cost of {max_cost}.",
+            extensions={"code": "QUERY_TOO_EXPENSIVE", **report},
+        )
+    return report
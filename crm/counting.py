@@ -0,0 +1,129 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError, connections
+from graphene_django.utils import maybe_queryset
+
+from .response_cache import record_tables
+
+
+# ============================
+# COUNT CACHE
+# ============================
+# Entries are keyed by the filtered COUNT's SQL and parameters plus a generation
+# number per table the query reads. A write to any of those tables bumps its
+# generation (see crm/signals.py), which orphans every dependent entry at once.
+# Counts are only cached in a shared backend (Redis, Memcached, database) named
+# by CRM_COUNT_CACHE: Celery workers, cron jobs and management commands write
+# from other processes, whose invalidations a per-process cache never sees.
+
+def _cache():
+    """The cache named by CRM_COUNT_CACHE, or None when counts aren't cached."""
+    alias = getattr(settings, "CRM_COUNT_CACHE", None)
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return None
+    return cache
+
+
+def _generation_key(table):
+    return f"crm:count:gen:{table}"
+
+
+def invalidate_table_counts(*tables):
+    cache = _cache()
+    if cache is None:
+        return
+    for table in tables:
+        try:
+            cache.incr(_generation_key(table))
+        except ValueError:
+            cache.set(_generation_key(table), 1, None)
+
+
+def invalidate_model_counts(*models):
+    invalidate_table_counts(*(model._meta.db_table for model in models))
+
+
+def _count_sql(queryset):
+    query = queryset.order_by().query
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    tables = sorted({alias.table_name for alias in query.alias_map.values()})
+    return sql, params, tables
+
+
+def _cache_key(cache, queryset, sql, params, tables):
+    generations = cache.get_many([_generation_key(t) for t in tables])
+    payload = json.dumps(
+        [queryset.db, sql, [str(p) for p in params], [generations.get(_generation_key(t), 0) for t in tables]]
+    )
+    return "crm:count:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ============================
+# ESTIMATES
+# ============================
+def estimate_count(queryset):
+    """
+    Row estimate from the planner / table statistics, or None when the backend
+    has nothing usable (falls back to an exact count).
+    """
+    connection = connections[queryset.db]
+    try:
+        if connection.vendor == "postgresql":
+            sql, params, _ = _count_sql(queryset)
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+
+        if connection.vendor == "sqlite" and not queryset.query.where:
+            # Populated by ANALYZE; the first number of `stat` is the table's row count.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    except (DatabaseError, EmptyResultSet):
+        return None
+    return None
+
+
+def count_queryset(queryset, estimated=False):
+    """COUNT(*) for a filtered queryset, served from the count cache when possible."""
+    queryset = maybe_queryset(queryset)
+    if getattr(queryset, "_result_cache", None) is not None:
+        return len(queryset._result_cache)
+
+    if estimated:
+        estimate = estimate_count(queryset)
+        if estimate is not None:
+            return estimate
+
+    try:
+        sql, params, tables = _count_sql(queryset)
+    except EmptyResultSet:
+        return 0
+    # A cache hit runs no SQL, so report the tables to the response cache directly
+    record_tables(tables)
+
+    cache = _cache()
+    if cache is None:
+        return queryset.count()
+    key = _cache_key(cache, queryset, sql, params, tables)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, "CRM_COUNT_CACHE_TIMEOUT", 300))
+    return count
@@ -1,12 +1,29 @@
 import os
 from datetime import datetime
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+
+from .executor import Operation
+
+# Both jobs run their operation in the cron process against crm.schema.schema
+HEARTBEAT = Operation("query Heartbeat { __typename }")
+
+UPDATE_LOW_STOCK = Operation("""
+mutation {
+  updateLowStockProducts {
+    success
+    message
+    updatedProducts {
+      name
+      stock
+    }
+  }
+}
+""")
+
 
 def log_crm_heartbeat():
     """
     Logs a heartbeat message every 5 minutes.
-    Optionally checks GraphQL hello field for responsiveness.
+    Optionally checks that the GraphQL schema executes.
     """
 
     log_file = "/tmp/crm_heartbeat_log.txt"
@@ -14,13 +31,8 @@ def log_crm_heartbeat():
 
     # Optional: check GraphQL health
     try:
-        endpoint = "http://localhost:8000/graphql"
-        transport = RequestsHTTPTransport(url=endpoint, verify=False)
-        client = Client(transport=transport, fetch_schema_from_transport=True)
-
-        query = gql("{ hello }")
-        result = client.execute(query)
-        response_message = result.get("hello", "No response")
+        result = HEARTBEAT.execute()
+        response_message = result.get("__typename", "No response")
         status = f"{timestamp} CRM is alive - GraphQL says: {response_message}\n"
     except Exception as e:
         status = f"{timestamp} CRM is alive - GraphQL check failed: {e}\n"
@@ -31,7 +43,7 @@ def log_crm_heartbeat():
 
 def update_low_stock():
     """
-    Runs every 12 hours.
+    Runs weekly as a safety net; low-stock events (crm/low_stock.py) restock products as they run low.
     Executes a GraphQL mutation to restock low-stock products
     and logs results to /tmp/low_stock_updates_log.txt.
     """
@@ -39,28 +51,7 @@ def update_low_stock():
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        # Connect to GraphQL endpoint
-        endpoint = "http://localhost:8000/graphql"
-        transport = RequestsHTTPTransport(url=endpoint, verify=False)
-        client = Client(transport=transport, fetch_schema_from_transport=True)
-
-        # Define and run mutation
-        mutation = gql(
-            """
-            mutation {
-              updateLowStockProducts {
-                success
-                message
-                updatedProducts {
-                  name
-                  stock
-                }
-              }
-            }
-            """
-        )
-
-        result = client.execute(mutation)
+        result = UPDATE_LOW_STOCK.execute()
         data = result.get("updateLowStockProducts", {})
 
         message = data.get("message", "No response message")
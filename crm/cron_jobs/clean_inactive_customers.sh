@@ -6,19 +6,8 @@
 # Navigate to the Django project directory
 cd "$(dirname "$0")/../.."  # Adjust if needed
 
-# Run Django shell command to delete inactive customers
-deleted_count=$(python3 manage.py shell <<EOF
-from datetime import timedelta
-from django.utils import timezone
-from crm.models import Customer
-
-one_year_ago = timezone.now() - timedelta(days=365)
-inactive_customers = Customer.objects.filter(orders__isnull=True) | Customer.objects.exclude(orders__date__gte=one_year_ago)
-count = inactive_customers.distinct().count()
-inactive_customers.distinct().delete()
-print(count)
-EOF
-)
+# Batched delete (see crm/management/commands/purge_inactive_customers.py)
+result=$(python3 manage.py purge_inactive_customers --days 365 --batch-size 500 --throttle 0.05 2>&1)
 
 # Log the result with timestamp
-echo "$(date '+%Y-%m-%d %H:%M:%S') - Deleted customers: $deleted_count" >> /tmp/customer_cleanup_log.txt
+echo "$(date '+%Y-%m-%d %H:%M:%S') - $result" >> /tmp/customer_cleanup_log.txt
@@ -1,49 +1,29 @@
 #!/usr/bin/env python3
 """
 Script: send_order_reminders.py
-Description: Queries pending orders (within the last 7 days) via GraphQL 
-and logs order details to /tmp/order_reminders_log.txt
+Description: Sends one reminder per customer with pending orders from the
+last 7 days through the configured sender (crm.reminders), resuming after
+the last run's cursor.
 """
 
-from datetime import datetime, timedelta
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+import os
+import sys
+from pathlib import Path
 
-# Define GraphQL endpoint
-endpoint = "http://localhost:8000/graphql"
+# Run in this process against the database; no web server needed
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "crm.settings")
 
-# Set up GraphQL client
-transport = RequestsHTTPTransport(url=endpoint, verify=False)
-client = Client(transport=transport, fetch_schema_from_transport=True)
+import django  # noqa: E402
 
-# Calculate date range for the last 7 days
-one_week_ago = (datetime.now() - timedelta(days=7)).date().isoformat()
+django.setup()
 
-# Define GraphQL query
-query = gql(
-    """
-    query GetRecentOrders($date: Date!) {
-      orders(orderDate_Gte: $date, status: "PENDING") {
-        id
-        customer {
-          email
-        }
-      }
-    }
-    """
-)
-
-# Execute the query
-params = {"date": one_week_ago}
-result = client.execute(query, variable_values=params)
+from crm.reminders import send_order_reminders  # noqa: E402
 
-# Log results
-log_file = "/tmp/order_reminders_log.txt"
-with open(log_file, "a") as f:
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for order in result.get("orders", []):
-        order_id = order["id"]
-        email = order["customer"]["email"]
-        f.write(f"{timestamp} - Order ID: {order_id}, Customer Email: {email}\n")
+stats = send_order_reminders(full="--full" in sys.argv)
 
-print("Order reminders processed!")
+print(
+    f"Order reminders processed! {stats.sent} sent, {stats.failed} failed, "
+    f"{stats.duplicates} duplicate orders folded, {stats.orders} orders in {stats.pages} pages, "
+    f"{stats.seconds:.1f}s ({stats.reminders_per_second:.1f} reminders/s)"
+)
@@ -0,0 +1,53 @@
+import logging
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+# ============================
+# SQLITE PRAGMAS
+# ============================
+# Applied to every new SQLite connection, in this order. journal_mode=WAL lets
+# readers run alongside the single writer instead of queueing behind it;
+# synchronous=NORMAL is durable across application crashes in WAL mode (a power
+# loss can drop the last commits, never corrupt the file).
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,  # Bytes of the file read through mmap
+    "cache_size": -64000,  # Page cache; negative values are KiB
+}
+
+_PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def sqlite_pragmas():
+    """CRM_SQLITE_PRAGMAS, skipping entries set to None or ''."""
+    pragmas = getattr(settings, "CRM_SQLITE_PRAGMAS", DEFAULT_SQLITE_PRAGMAS)
+    statements = []
+    for name, value in pragmas.items():
+        if value in (None, ""):
+            continue
+        if not name.isidentifier() or not _PRAGMA_VALUE.match(str(value)):
+            raise ImproperlyConfigured(f"Invalid CRM_SQLITE_PRAGMAS entry: {name}={value!r}")
+        statements.append((name, str(value), f"PRAGMA {name} = {value}"))
+    return statements
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value, statement in sqlite_pragmas():
+            cursor.execute(statement)
+            if name == "journal_mode":
+                # In-memory databases always report "memory"; anything else is worth knowing
+                mode = cursor.fetchone()[0]
+                if mode.lower() not in (value.lower(), "memory"):
+                    logger.warning("SQLite kept journal_mode=%s (requested %s)", mode, value)
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from django.db import transaction
+from graphql import OperationType, execute, get_operation_ast
+
+from .persisted import get_document, query_hash
+
+
+class OperationError(Exception):
+    """Raised when an in-process operation fails validation or returns errors."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("; ".join(error.message for error in self.errors))
+
+
+class Operation:
+    """
+    A GraphQL operation executed directly against crm.schema.schema in the
+    current process: no HTTP hop, no schema introspection, no dependency on
+    the web tier. The parsed, validated document comes from the shared
+    document cache, so a job parses its operation once per process.
+    """
+
+    def __init__(self, query, operation_name=None):
+        self.query = query
+        self.operation_name = operation_name
+        self.key = query_hash(query)
+
+    def execute(self, variables=None, context=None, atomic=False):
+        """
+        Returns the result data, or raises OperationError. With atomic=True a
+        mutation runs in one transaction, rolled back if any field fails; by
+        default each mutation keeps its own transactions (e.g. the restock's
+        per-chunk commits).
+        """
+        from .schema import schema
+
+        graphql_schema = schema.graphql_schema
+        document, errors = get_document(graphql_schema, self.query, key=self.key)
+        if errors:
+            raise OperationError(errors)
+
+        options = {
+            "variable_values": variables,
+            "operation_name": self.operation_name,
+            # Per-run context object; request-scoped helpers (e.g. loaders) attach to it
+            "context_value": context if context is not None else SimpleNamespace(),
+        }
+        operation = get_operation_ast(document, self.operation_name)
+        if atomic and operation is not None and operation.operation == OperationType.MUTATION:
+            with transaction.atomic():
+                result = execute(graphql_schema, document, **options)
+                if result.errors:
+                    transaction.set_rollback(True)
+        else:
+            result = execute(graphql_schema, document, **options)
+
+        if result.errors:
+            raise OperationError(result.errors)
+        return result.data
+
+
+def execute_operation(query, variables=None, operation_name=None):
+    return Operation(query, operation_name).execute(variables)
@@ -0,0 +1,98 @@
+import csv
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .filters import CustomerFilter, OrderFilter
+from .models import Customer, Order
+
+
+# ============================
+# ROWS
+# ============================
+# Rows are read with values() rather than model instances: an export touches
+# every row once, so instantiation would dominate the cost.
+
+def iter_chunks(queryset, chunk_size):
+    """Lists of up to chunk_size rows from a single server-side iterator()."""
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def order_rows(queryset, chunk_size):
+    rows = queryset.order_by("pk").values(
+        "id", "customer_id", "customer__name", "customer__email", "order_date", "total_amount"
+    )
+    through = Order.products.through.objects
+    for chunk in iter_chunks(rows, chunk_size):
+        # One query per chunk for the products, like prefetch_related
+        products = defaultdict(list)
+        pairs = through.filter(order_id__in=[row["id"] for row in chunk]).values_list("order_id", "product_id")
+        for order_id, product_id in pairs.order_by("order_id", "product_id"):
+            products[order_id].append(product_id)
+
+        for row in chunk:
+            yield {
+                "id": row["id"],
+                "customer_id": row["customer_id"],
+                "customer_name": row["customer__name"],
+                "customer_email": row["customer__email"],
+                "order_date": row["order_date"],
+                "total_amount": row["total_amount"],
+                "product_ids": products[row["id"]],
+            }
+
+
+def customer_rows(queryset, chunk_size):
+    return queryset.order_by("pk").values("id", "name", "email", "phone").iterator(chunk_size=chunk_size)
+
+
+# name -> (model, filterset class, row generator, CSV columns)
+EXPORTS = {
+    "orders": (
+        Order, OrderFilter, order_rows,
+        ["id", "customer_id", "customer_name", "customer_email", "order_date", "total_amount", "product_ids"],
+    ),
+    "customers": (
+        Customer, CustomerFilter, customer_rows,
+        ["id", "name", "email", "phone"],
+    ),
+}
+
+
+def export_rows(name, queryset, chunk_size=None):
+    chunk_size = chunk_size or getattr(settings, "CRM_EXPORT_CHUNK_SIZE", 2000)
+    return EXPORTS[name][2](queryset, chunk_size)
+
+
+# ============================
+# ENCODERS
+# ============================
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([
+            ";".join(map(str, value)) if isinstance(value, list) else value
+            for value in (row[column] for column in columns)
+        ])
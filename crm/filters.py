@@ -1,9 +1,11 @@
 import django_filters
 from .models import Customer, Product, Order
+from .search import search
 
 class CustomerFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(field_name="name", lookup_expr="icontains")
-    email = django_filters.CharFilter(field_name="email", lookup_expr="icontains")
+    # Substring matches go through the search index (crm/search.py)
+    name = django_filters.CharFilter(method='filter_search')
+    email = django_filters.CharFilter(method='filter_search')
     created_at__gte = django_filters.DateFilter(field_name="created_at", lookup_expr="gte")
     created_at__lte = django_filters.DateFilter(field_name="created_at", lookup_expr="lte")
     phone_pattern = django_filters.CharFilter(method='filter_phone_pattern')
@@ -11,18 +13,24 @@ class CustomerFilter(django_filters.FilterSet):
     def filter_phone_pattern(self, queryset, name, value):
         return queryset.filter(phone__startswith=value)
 
+    def filter_search(self, queryset, name, value):
+        return search(queryset, value, fields=[name])
+
     class Meta:
         model = Customer
         fields = ['name', 'email', 'created_at__gte', 'created_at__lte', 'phone']
 
 
 class ProductFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(field_name="name", lookup_expr="icontains")
+    name = django_filters.CharFilter(method='filter_search')
     price__gte = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
     price__lte = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
     stock__gte = django_filters.NumberFilter(field_name="stock", lookup_expr="gte")
     stock__lte = django_filters.NumberFilter(field_name="stock", lookup_expr="lte")
 
+    def filter_search(self, queryset, name, value):
+        return search(queryset, value, fields=[name])
+
     class Meta:
         model = Product
         fields = ['name', 'price', 'stock']
@@ -33,12 +41,21 @@ class OrderFilter(django_filters.FilterSet):
     total_amount__lte = django_filters.NumberFilter(field_name="total_amount", lookup_expr="lte")
     order_date__gte = django_filters.DateFilter(field_name="order_date", lookup_expr="gte")
     order_date__lte = django_filters.DateFilter(field_name="order_date", lookup_expr="lte")
-    customer_name = django_filters.CharFilter(field_name="customer__name", lookup_expr="icontains")
-    product_name = django_filters.CharFilter(field_name="products__name", lookup_expr="icontains")
+    customer_name = django_filters.CharFilter(method='filter_customer_name')
+    product_name = django_filters.CharFilter(method='filter_product_name')
     product_id = django_filters.NumberFilter(field_name="products__id")
+    status = django_filters.ChoiceFilter(field_name="status", choices=Order.STATUS_CHOICES)
+
+    def filter_customer_name(self, queryset, name, value):
+        return queryset.filter(customer__in=search(Customer.objects.all(), value, fields=['name']))
+
+    def filter_product_name(self, queryset, name, value):
+        matches = search(Product.objects.all(), value, fields=['name'])
+        order_ids = Order.products.through.objects.filter(product__in=matches).values('order_id')
+        return queryset.filter(pk__in=order_ids)
 
     class Meta:
         model = Order
         fields = [
-            'total_amount', 'order_date', 'customer_name', 'product_name', 'product_id'
+            'total_amount', 'order_date', 'customer_name', 'product_name', 'product_id', 'status'
         ]
@@ -0,0 +1,237 @@
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import IdempotencyKey
+from .response_cache import get_viewer
+
+
+# ============================
+# PAYLOADS
+# ============================
+# Stored payloads keep model instances as (model label, pk) references, so a
+# replay answers any selection set the same way the first response did.
+
+def dump_payload(payload):
+    return {name: _dump(getattr(payload, name, None)) for name in type(payload)._meta.fields}
+
+
+def _dump(value):
+    if isinstance(value, models.Model):
+        return {"$model": value._meta.label_lower, "pk": value.pk}
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    return value
+
+
+def load_payload(mutation, data):
+    """Rebuilds the mutation payload with one in_bulk() per referenced model."""
+    refs = {}
+
+    def collect(value):
+        if isinstance(value, dict) and "$model" in value:
+            refs.setdefault(value["$model"], set()).add(value["pk"])
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+
+    def build(value):
+        if isinstance(value, dict) and "$model" in value:
+            return instances[value["$model"]].get(value["pk"])
+        if isinstance(value, list):
+            return [build(item) for item in value]
+        return value
+
+    collect(list(data.values()))
+    instances = {label: apps.get_model(label).objects.in_bulk(pks) for label, pks in refs.items()}
+    return mutation(**{name: build(value) for name, value in data.items()})
+
+
+# ============================
+# FRONT CACHE
+# ============================
+class ReplayCache:
+    """Bounded, thread-safe LRU of completed keys: key -> (fingerprint, payload data, expires_at)."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= timezone.now():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, fingerprint, data, expires_at):
+        with self._lock:
+            self._entries[key] = (fingerprint, data, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+replays = ReplayCache(getattr(settings, "CRM_IDEMPOTENCY_CACHE_SIZE", 10000))
+
+
+# ============================
+# KEYS
+# ============================
+def fingerprint(operation, arguments, viewer):
+    payload = json.dumps([operation, arguments, viewer], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _stored(key):
+    """(fingerprint, data, expires_at) of a completed, unexpired key; None if absent or still running."""
+    entry = replays.get(key)
+    if entry is not None:
+        return entry
+    record = (
+        IdempotencyKey.objects.filter(key=key, expires_at__gt=timezone.now(), response__isnull=False)
+        .values_list("fingerprint", "response", "expires_at")
+        .first()
+    )
+    if record is not None:
+        replays.set(key, *record)
+    return record
+
+
+def _claim(key, digest):
+    """
+    Inserts a running claim for `key`, or takes over an expired or abandoned
+    one. Returns the claim's expiry, or None when another request holds the key.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=getattr(settings, "CRM_IDEMPOTENCY_TTL", 86400))
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, fingerprint=digest, created_at=now, expires_at=expires_at)
+        return expires_at
+    except IntegrityError:
+        abandoned = now - timedelta(seconds=getattr(settings, "CRM_IDEMPOTENCY_PENDING_TIMEOUT", 300))
+        taken = (
+            IdempotencyKey.objects.filter(key=key)
+            .filter(Q(expires_at__lte=now) | Q(response__isnull=True, created_at__lt=abandoned))
+            .update(fingerprint=digest, response=None, created_at=now, expires_at=expires_at)
+        )
+        return expires_at if taken else None
+
+
+class _RunningCall:
+    __slots__ = ("key", "digest", "expires_at", "data")
+
+    def __init__(self, key, digest, expires_at):
+        self.key = key
+        self.digest = digest
+        self.expires_at = expires_at
+        self.data = None
+
+
+_running = ContextVar("crm_idempotent_call", default=None)
+
+
+def store_response(payload):
+    """
+    Stores `payload` as the response of the running keyed call; a no-op
+    without an idempotencyKey. Mutations declared with
+    @idempotent(atomic=False) call it as the last step inside their own write
+    transaction, so the response commits together with the writes.
+    """
+    call = _running.get()
+    if call is None or call.data is not None:
+        return
+    call.data = data = dump_payload(payload)
+    IdempotencyKey.objects.filter(key=call.key).update(response=data)
+    # An enclosing transaction (ATOMIC_MUTATIONS) can still roll the response back
+    transaction.on_commit(lambda: replays.set(call.key, call.digest, data, call.expires_at))
+
+
+def idempotent(mutate=None, *, atomic=True):
+    """
+    Adds idempotencyKey handling to a mutation's mutate(); declare
+    `idempotency_key = graphene.String()` in its Arguments. The first request
+    with a key runs and stores its payload; retries with the same key and
+    arguments get the stored payload without running again. Failed runs
+    store nothing, so they can be retried.
+
+    Keyed calls run in one transaction.atomic() with the stored response.
+    A mutation that opens its own short write transaction uses
+    @idempotent(atomic=False) and calls store_response() inside it instead,
+    so its validation reads stay outside the transaction.
+    """
+    if mutate is None:
+        return functools.partial(idempotent, atomic=atomic)
+
+    @functools.wraps(mutate)
+    def wrapper(root, info, idempotency_key=None, **kwargs):
+        if not idempotency_key:
+            return mutate(root, info, **kwargs)
+        if len(idempotency_key) > 255:
+            raise ValidationError("idempotencyKey must be at most 255 characters.")
+
+        mutation = info.return_type.graphene_type
+        digest = fingerprint(info.field_name, kwargs, get_viewer(info.context))
+
+        stored = _stored(idempotency_key)
+        expires_at = None
+        if stored is None:
+            expires_at = _claim(idempotency_key, digest)
+            if expires_at is None:
+                # Lost the race: the other request finished meanwhile, or is still running
+                stored = _stored(idempotency_key)
+                if stored is None:
+                    raise ValidationError("A request with this idempotencyKey is still in progress.")
+        if stored is not None:
+            if stored[0] != digest:
+                raise ValidationError("idempotencyKey was already used with different arguments.")
+            return load_payload(mutation, stored[1])
+
+        token = _running.set(_RunningCall(idempotency_key, digest, expires_at))
+        try:
+            # The writes and the stored response commit together: a crash in between
+            # can't leave the writes behind a key that still looks unfinished
+            if atomic:
+                with transaction.atomic():
+                    payload = mutate(root, info, **kwargs)
+                    store_response(payload)
+            else:
+                payload = mutate(root, info, **kwargs)
+                # A mutation that made no writes may return without storing it
+                store_response(payload)
+        except Exception:
+            IdempotencyKey.objects.filter(key=idempotency_key, response__isnull=True).delete()
+            raise
+        finally:
+            _running.reset(token)
+        return payload
+
+    return wrapper
+
+
+def purge_expired_keys():
+    """Deletes expired keys; returns how many."""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,306 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .low_stock import record_low_stock
+from .models import Customer, DailySales, Order, Product
+from .rollups import order_day, refresh_days
+from .signals import invalidate_caches
+from .validators import validate_phone, validate_product
+
+
+# ============================
+# READERS
+# ============================
+def read_rows(path, file_format=None):
+    """
+    Yields (line number, row dict) from a CSV (header row) or NDJSON file, one line at a time.
+    Lines that aren't a JSON object are yielded with a ValidationError instead of a dict.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        if file_format not in ("ndjson", "jsonl", "json"):
+            raise ValueError(f"Unsupported import format: {file_format}")
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError
+            except ValueError:
+                row = ValidationError("Line is not a JSON object.")
+            yield line_number, row
+
+
+def _batches(rows, size):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _id_list(value):
+    """product_ids as a JSON list or a ';'-separated CSV cell."""
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        value = value.split(";")
+    if not isinstance(value, list):
+        raise ValidationError("product_ids must be a list.")
+    try:
+        return [int(v) for v in value]
+    except (TypeError, ValueError):
+        raise ValidationError("One or more product IDs are invalid.")
+
+
+# ============================
+# IMPORTER
+# ============================
+class ImportStats:
+    def __init__(self, label):
+        self.label = label
+        self.imported = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        total = self.imported + self.rejected
+        return total / self.seconds if self.seconds else float(total)
+
+
+class Importer:
+    """
+    Validates rows with the create mutations' rules and writes them with one
+    bulk_create (plus one through-table bulk_create for orders) per batch.
+    Foreign keys in order rows are resolved through in-memory maps that hold
+    everything imported in this run and anything looked up so far.
+    `on_reject(label, line_number, row, message)` is called for every rejected row.
+    """
+
+    def __init__(self, batch_size=None, on_reject=None):
+        self.batch_size = batch_size or getattr(settings, "CRM_BULK_CREATE_BATCH_SIZE", 500)
+        self.on_reject = on_reject or (lambda label, line_number, row, message: None)
+        self.customer_ids = {}  # email -> pk
+        self.known_customers = set()  # pks
+        self.product_prices = {}  # pk -> price
+        self.order_days = set()  # DailySales rows to refresh after the orders are in
+
+    def _reject(self, stats, line_number, row, error):
+        stats.rejected += 1
+        message = error.messages[0] if isinstance(error, ValidationError) else str(error)
+        self.on_reject(stats.label, line_number, row, message)
+
+    def _run(self, label, rows, build, write):
+        stats = ImportStats(label)
+        for batch in _batches(rows, self.batch_size):
+            self._prefetch(label, [row for _, row in batch if isinstance(row, dict)])
+            pending = []
+            for line_number, row in batch:
+                try:
+                    if not isinstance(row, dict):
+                        raise row
+                    pending.append((line_number, row, build(row)))
+                except ValidationError as e:
+                    self._reject(stats, line_number, row if isinstance(row, dict) else None, e)
+            if pending:
+                write(stats, pending)
+        return stats.finish()
+
+    def _prefetch(self, label, rows):
+        """One query per batch for the keys its rows reference that aren't mapped yet."""
+        if label == "customers":
+            emails = {(row.get("email") or "").strip() for row in rows}
+            emails = {email for email in emails if email not in self.customer_ids}
+            if emails:
+                self.customer_ids.update(Customer.objects.filter(email__in=emails).values_list("email", "pk"))
+        elif label == "orders":
+            emails = {
+                row["customer_email"] for row in rows
+                if row.get("customer_email") and row["customer_email"] not in self.customer_ids
+            }
+            if emails:
+                self.customer_ids.update(Customer.objects.filter(email__in=emails).values_list("email", "pk"))
+            ids = set()
+            products = set()
+            for row in rows:
+                try:
+                    if row.get("customer_id") not in (None, ""):
+                        ids.add(int(row["customer_id"]))
+                    products.update(_id_list(row.get("product_ids")))
+                except (ValueError, ValidationError):
+                    continue
+            ids = {pk for pk in ids if pk not in self.known_customers}
+            if ids:
+                self.known_customers.update(Customer.objects.filter(pk__in=ids).values_list("pk", flat=True))
+            products = {pk for pk in products if pk not in self.product_prices}
+            if products:
+                self.product_prices.update(Product.objects.filter(pk__in=products).values_list("pk", "price"))
+
+    # ----------------------------
+    # Customers
+    # ----------------------------
+    def import_customers(self, rows):
+        return self._run("customers", rows, self._build_customer, self._write_customers)
+
+    def _build_customer(self, row):
+        name = (row.get("name") or "").strip()
+        email = (row.get("email") or "").strip()
+        phone = (row.get("phone") or "").strip()
+        if not name or not email:
+            raise ValidationError("name and email are required.")
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise ValidationError(f"Invalid email format: {email}")
+        if email in self.customer_ids:
+            raise ValidationError(f"Email already exists: {email}")
+        validate_phone(phone)
+        # Reserve the email so a duplicate later in the file is rejected too
+        self.customer_ids[email] = None
+        return Customer(name=name, email=email, phone=phone)
+
+    def _write_customers(self, stats, pending):
+        customers = [customer for _, _, customer in pending]
+        try:
+            with transaction.atomic():
+                Customer.objects.bulk_create(customers)
+            stats.imported += len(customers)
+        except IntegrityError:
+            # A concurrent writer took one of the emails; retry the batch row by row
+            for line_number, row, customer in pending:
+                try:
+                    with transaction.atomic():
+                        customer.save(force_insert=True)
+                    stats.imported += 1
+                except IntegrityError:
+                    customer.pk = None
+                    self._reject(stats, line_number, row, ValidationError(f"Email already exists: {customer.email}"))
+        for customer in customers:
+            if customer.pk is not None:
+                self.customer_ids[customer.email] = customer.pk
+                self.known_customers.add(customer.pk)
+
+    # ----------------------------
+    # Products
+    # ----------------------------
+    def import_products(self, rows):
+        return self._run("products", rows, self._build_product, self._write_products)
+
+    def _build_product(self, row):
+        name = (row.get("name") or "").strip()
+        if not name:
+            raise ValidationError("name is required.")
+        try:
+            price = Decimal(str(row.get("price"))).quantize(Decimal("0.01"))
+            stock = int(row.get("stock") or 0)
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValidationError("price must be a number and stock an integer.")
+        validate_product(price, stock)
+        return Product(name=name, price=price, stock=stock)
+
+    def _write_products(self, stats, pending):
+        with transaction.atomic():
+            products = Product.objects.bulk_create([product for _, _, product in pending])
+            # bulk_create skips the post_save receiver that records low-stock events
+            record_low_stock(products)
+        self.product_prices.update((product.pk, product.price) for product in products)
+        stats.imported += len(products)
+
+    # ----------------------------
+    # Orders
+    # ----------------------------
+    def import_orders(self, rows):
+        stats = self._run("orders", rows, self._build_order, self._write_orders)
+        # bulk_create skips the signals that maintain the daily sales rollup
+        refresh_days(self.order_days)
+        return stats
+
+    def _build_order(self, row):
+        if row.get("customer_email"):
+            customer_id = self.customer_ids.get(row["customer_email"])
+        else:
+            try:
+                customer_id = int(row.get("customer_id"))
+            except (TypeError, ValueError):
+                customer_id = None
+            if customer_id not in self.known_customers:
+                customer_id = None
+        if customer_id is None:
+            raise ValidationError("Customer not found.")
+
+        product_ids = _id_list(row.get("product_ids"))
+        if not product_ids:
+            raise ValidationError("No valid products found.")
+        if len(set(product_ids)) != len(product_ids) or any(pk not in self.product_prices for pk in product_ids):
+            raise ValidationError("One or more product IDs are invalid.")
+
+        order_date = timezone.now()
+        if row.get("order_date"):
+            order_date = parse_datetime(str(row["order_date"]))
+            if order_date is None:
+                raise ValidationError(f"Invalid order_date: {row['order_date']}")
+            if timezone.is_naive(order_date):
+                order_date = timezone.make_aware(order_date)
+
+        order = Order(
+            customer_id=customer_id,
+            total_amount=sum(self.product_prices[pk] for pk in product_ids),
+            order_date=order_date,
+        )
+        order.import_product_ids = product_ids
+        return order
+
+    def _write_orders(self, stats, pending):
+        Through = Order.products.through
+        with transaction.atomic():
+            orders = Order.objects.bulk_create([order for _, _, order in pending])
+            Through.objects.bulk_create([
+                Through(order_id=order.pk, product_id=product_id)
+                for order in orders
+                for product_id in order.import_product_ids
+            ])
+        self.order_days.update(order_day(order) for order in orders)
+        stats.imported += len(orders)
+
+    # ----------------------------
+    # Entry point
+    # ----------------------------
+    def run(self, customers=None, products=None, orders=None, file_format=None):
+        """Imports the given files in dependency order; returns their ImportStats."""
+        results = []
+        for path, method, models in (
+            (customers, self.import_customers, [Customer]),
+            (products, self.import_products, [Product]),
+            (orders, self.import_orders, [Order, Order.products.through, DailySales]),
+        ):
+            if path:
+                stats = method(read_rows(path, file_format))
+                if stats.imported:
+                    invalidate_caches(*models)
+                results.append(stats)
+        return results
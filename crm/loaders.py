@@ -0,0 +1,122 @@
+import threading
+from collections import defaultdict
+
+from graphene_django.utils import maybe_queryset
+
+from .models import Customer, Order
+from .pagination import KeysetConnectionField
+
+
+# ============================
+# BATCH LOADER
+# ============================
+class DataLoader:
+    """
+    Synchronous batch loader.
+    Keys are queued with prime() by the resolver that returned the parent list;
+    the first load() of a missing key fetches every queued key in one query.
+    Safe to share between the threads that resolve root fields concurrently
+    (see crm/async_execution.py).
+    """
+
+    def __init__(self, batch_load_fn):
+        self.batch_load_fn = batch_load_fn
+        self._cache = {}
+        self._queue = {}
+        self._lock = threading.RLock()
+
+    def prime(self, keys):
+        with self._lock:
+            for key in keys:
+                if key not in self._cache:
+                    self._queue[key] = None
+
+    def load(self, key):
+        with self._lock:
+            if key not in self._cache:
+                self._queue[key] = None
+                self.dispatch()
+            return self._cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        return [self.load(key) for key in keys]
+
+    def dispatch(self):
+        with self._lock:
+            keys = list(self._queue)
+            self._queue.clear()
+            if keys:
+                self._cache.update(zip(keys, self.batch_load_fn(keys)))
+
+
+def load_customers(customer_ids):
+    customers = Customer.objects.in_bulk(customer_ids)
+    return [customers.get(pk) for pk in customer_ids]
+
+
+def load_order_products(order_ids):
+    through = Order.products.through
+    products = defaultdict(list)
+    rows = through.objects.filter(order_id__in=order_ids).select_related("product").order_by("pk")
+    for row in rows:
+        products[row.order_id].append(row.product)
+    return [products[pk] for pk in order_ids]
+
+
+# ============================
+# PER-REQUEST LOADERS
+# ============================
+class Loaders:
+    def __init__(self):
+        self.customer = DataLoader(load_customers)
+        self.order_products = DataLoader(load_order_products)
+
+    def prime_orders(self, orders):
+        orders = list(orders)
+        self.customer.prime(o.customer_id for o in orders)
+        self.order_products.prime(o.pk for o in orders)
+
+
+def get_loaders(info):
+    """Returns the loaders attached to the GraphQL context, creating them on first use."""
+    context = info.context
+    loaders = getattr(context, "crm_loaders", None)
+    if loaders is None:
+        loaders = Loaders()
+        try:
+            setattr(context, "crm_loaders", loaders)
+        except AttributeError:
+            # Context doesn't accept attributes (e.g. None); loaders live for this call only.
+            pass
+    return loaders
+
+
+class OrderConnectionField(KeysetConnectionField):
+    """
+    Connection field that primes the order loaders with the orders on the current page.
+    Orders already prefetched by the query planner are paginated in memory when no filter is given.
+    """
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        queryset = maybe_queryset(iterable)
+        filtered = any(args.get(name) is not None for name in filtering_args)
+        if getattr(queryset, "_result_cache", None) is not None and not filtered:
+            return queryset
+        return super().resolve_queryset(
+            connection, iterable, info, args, filtering_args, filterset_class
+        )
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver,
+                            max_limit, enforce_first_or_last, root, info, **args):
+        resolved = super().connection_resolver(
+            resolver, connection, default_manager, queryset_resolver,
+            max_limit, enforce_first_or_last, root, info, **args
+        )
+        edges = getattr(resolved, "edges", None)
+        if edges is not None:
+            get_loaders(info).prime_orders(edge.node for edge in edges)
+        return resolved
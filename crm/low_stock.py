@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import RestockRequest
+
+
+# ============================
+# LOW-STOCK EVENTS
+# ============================
+# A stock change that leaves a product below CRM_LOW_STOCK_THRESHOLD writes a
+# RestockRequest row in the same transaction, so an event exists exactly when
+# the change committed. Celery beat drains the table every CRM_RESTOCK_DEBOUNCE
+# seconds (crm.tasks.restock_low_stock_task): every event of the window is
+# folded into that run, which restocks the distinct products in one batched
+# UPDATE. Nothing talks to the broker while a request commits, so a broker
+# outage only delays restocking. The scheduled full scan
+# (crm.cron.update_low_stock) remains as a safety net.
+
+
+def low_stock_threshold():
+    return getattr(settings, "CRM_LOW_STOCK_THRESHOLD", 10)
+
+
+def record_low_stock(products):
+    """
+    Records a restock event for each of `products` (Product instances with
+    current stock) that is below the threshold. Call it after any stock
+    change that skips post_save, e.g. queryset.update() or bulk_create().
+    """
+    threshold = low_stock_threshold()
+    product_ids = sorted({product.pk for product in products if product.stock < threshold})
+    if not product_ids:
+        return
+    RestockRequest.objects.bulk_create(RestockRequest(product_id=pk) for pk in product_ids)
+    if not getattr(settings, "CRM_RESTOCK_DEBOUNCE", 30):
+        # No beat window: restock as soon as the change commits (robust: a failure is
+        # logged and the requests stay for the next event or the scan)
+        transaction.on_commit(drain_restock_requests, robust=True)
+
+
+def drain_restock_requests(increment=None):
+    """
+    Restocks every product with a pending request that is still below the
+    threshold, in one batched update, then removes the requests it handled.
+    Returns the updated products.
+    """
+    # Imported here: crm.stock imports crm.signals, which imports this module
+    from .stock import restock_low_stock
+
+    increment = increment or getattr(settings, "CRM_RESTOCK_INCREMENT", 10)
+    pending = dict(RestockRequest.objects.values_list("pk", "product_id"))
+    if not pending:
+        return []
+
+    updated = restock_low_stock(
+        threshold=low_stock_threshold(), increment=increment, product_ids=set(pending.values())
+    )
+    # By primary key: requests recorded while this ran stay for the next run
+    RestockRequest.objects.filter(pk__in=list(pending)).delete()
+    return updated
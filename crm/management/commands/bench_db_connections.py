@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connections, transaction
+from django.test.utils import override_settings
+
+from crm.db import DEFAULT_SQLITE_PRAGMAS
+from crm.models import Customer
+from crm.signals import invalidate_caches
+
+EMAIL_PREFIX = "dbbench-"
+
+# Django's stock SQLite connection: rollback journal, no mmap, 2 MB page cache
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "mmap_size": "0", "cache_size": "-2000"}
+
+
+class Result:
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self.read_latencies = []
+        self.lock = threading.Lock()
+
+    def add(self, kind, seconds):
+        with self.lock:
+            if kind == "read":
+                self.reads += 1
+                self.read_latencies.append(seconds)
+            else:
+                self.writes += 1
+
+    def p95_read_ms(self):
+        if not self.read_latencies:
+            return 0.0
+        latencies = sorted(self.read_latencies)
+        return latencies[int(len(latencies) * 0.95)] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures concurrent read/write throughput with Django's default connection handling "
+        "(rollback journal, reconnect per request) and with the configured pragmas and CONN_MAX_AGE. "
+        "Writes throwaway customers and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8, help="Reader threads (default 8).")
+        parser.add_argument("--writers", type=int, default=2, help="Writer threads (default 2).")
+        parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Customers per write, like bulkCreateCustomers.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        vendor = connections[alias].vendor
+        configured_age = connections[alias].settings_dict.get("CONN_MAX_AGE") or 0
+        profiles = [
+            ("before", BASELINE_PRAGMAS, 0),
+            ("after", getattr(settings, "CRM_SQLITE_PRAGMAS", DEFAULT_SQLITE_PRAGMAS), configured_age),
+        ]
+        if vendor != "sqlite":
+            self.stdout.write(f"{vendor}: pragmas don't apply; comparing CONN_MAX_AGE only.")
+
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, {options['seconds']:g}s per run\n"
+            f"{'run':8} {'reads/s':>10} {'writes/s':>10} {'rows/s':>10} {'p95 read':>11} {'errors':>7}"
+        )
+        upper = Customer.objects.using(alias).order_by("-pk").values_list("pk", flat=True).first() or 1
+        try:
+            for label, pragmas, conn_max_age in profiles:
+                result = self.run(alias, pragmas, conn_max_age, upper, options)
+                seconds = options["seconds"]
+                self.stdout.write(
+                    f"{label:8} {result.reads / seconds:10.0f} {result.writes / seconds:10.0f}"
+                    f" {result.writes * options['batch_size'] / seconds:10.0f}"
+                    f" {result.p95_read_ms():8.2f} ms {result.errors:7}"
+                )
+        finally:
+            connections.close_all()
+            deleted = Customer.objects.using(alias).filter(email__startswith=EMAIL_PREFIX)._raw_delete(alias)
+            if deleted:
+                invalidate_caches(Customer)
+            connections.close_all()
+
+    def run(self, alias, pragmas, conn_max_age, upper, options):
+        # Every connection opened from here on picks up this profile. journal_mode
+        # can only leave WAL while no other connection is open.
+        connections.close_all()
+        settings_dict = connections.settings[alias]
+        saved_age = settings_dict.get("CONN_MAX_AGE")
+        settings_dict["CONN_MAX_AGE"] = conn_max_age
+
+        result = Result()
+        deadline = time.perf_counter() + options["seconds"]
+        run_id = f"{time.time_ns()}"
+
+        def worker(kind, number):
+            rng = random.Random(number)
+            sequence = 0
+            try:
+                while time.perf_counter() < deadline:
+                    # What Django does around every request
+                    close_old_connections()
+                    start = time.perf_counter()
+                    try:
+                        if kind == "read":
+                            list(
+                                Customer.objects.using(alias).filter(pk__gte=rng.randrange(1, upper + 1))
+                                .order_by("pk").values("pk", "name", "email")[:20]
+                            )
+                        else:
+                            with transaction.atomic(using=alias):
+                                Customer.objects.using(alias).bulk_create([
+                                    Customer(name="Bench", email=f"{EMAIL_PREFIX}{run_id}-{number}-{sequence + i}@example.com")
+                                    for i in range(options["batch_size"])
+                                ])
+                            sequence += options["batch_size"]
+                        result.add(kind, time.perf_counter() - start)
+                    except OperationalError:
+                        with result.lock:
+                            result.errors += 1
+                    close_old_connections()
+            finally:
+                connections[alias].close()
+
+        with override_settings(CRM_SQLITE_PRAGMAS=pragmas):
+            threads = [
+                threading.Thread(target=worker, args=("read", n)) for n in range(options["readers"])
+            ] + [
+                threading.Thread(target=worker, args=("write", options["readers"] + n)) for n in range(options["writers"])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        settings_dict["CONN_MAX_AGE"] = saved_age
+        return result
@@ -0,0 +1,136 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from crm.filters import CustomerFilter, OrderFilter, ProductFilter
+from crm.models import Customer, Order, Product
+
+
+# ============================
+# CASES
+# ============================
+# (label, indexes dropped for the "without" run, queryset factory)
+def _cases(now):
+    return [
+        (
+            "OrderFilter order_date__gte",
+            ("order_date_id_idx", "order_status_date_id_idx"),
+            lambda: OrderFilter({"order_date__gte": (now - timedelta(days=3)).date()}, queryset=Order.objects.all()).qs,
+        ),
+        (
+            "OrderFilter total_amount range",
+            ("order_total_amount_idx",),
+            lambda: OrderFilter({"total_amount__gte": 100, "total_amount__lte": 105}, queryset=Order.objects.all()).qs,
+        ),
+        (
+            "allOrders keyset page",
+            ("order_date_id_idx", "order_status_date_id_idx"),
+            lambda: Order.objects.filter(order_date__gt=now - timedelta(days=30)).order_by("order_date", "pk")[:51],
+        ),
+        (
+            "ProductFilter price range",
+            ("product_price_idx",),
+            lambda: ProductFilter({"price__gte": 10, "price__lte": 11}, queryset=Product.objects.all()).qs,
+        ),
+        (
+            "ProductFilter stock__lte",
+            ("product_stock_idx",),
+            lambda: ProductFilter({"stock__lte": 2}, queryset=Product.objects.all()).qs,
+        ),
+        (
+            "CustomerFilter phone_pattern",
+            ("customer_phone_idx",),
+            lambda: CustomerFilter({"phone_pattern": "+1555123"}, queryset=Customer.objects.all()).qs,
+        ),
+    ]
+
+
+def access_path(plan):
+    """'index' or 'table scan' from an EXPLAIN (SQLite QUERY PLAN or PostgreSQL text) output."""
+    if "USING INDEX" in plan or "USING COVERING INDEX" in plan or "Index" in plan:
+        return "index"
+    return "table scan"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the plan and run time of each crm filter with and without its index. "
+        "--seed fills the tables with synthetic rows first; never run it against production data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per table to seed (default 1,000,000).")
+        parser.add_argument("--seed", action="store_true", help="Insert synthetic rows until each table has --rows.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best time is reported.")
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options["seed"]:
+            self.seed(options["rows"], options["batch_size"], now)
+        if not Order.objects.exists():
+            raise CommandError("No orders to benchmark against; run with --seed.")
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        self.stdout.write(f"{'filter':34} {'without index':>26} {'with index':>26}")
+        for label, indexes, factory in _cases(now):
+            # A fresh connection per run: SQLite caches prepared EXPLAINs across schema changes
+            connection.close()
+            with transaction.atomic():
+                # DDL is transactional on SQLite and PostgreSQL; the index comes back on rollback
+                with connection.cursor() as cursor:
+                    for index in indexes:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(index)}")
+                without_plan, without_time = self.measure(factory, options["repeat"])
+                transaction.set_rollback(True)
+            connection.close()
+            with_plan, with_time = self.measure(factory, options["repeat"])
+
+            self.stdout.write(
+                f"{label:34} {access_path(without_plan):>14} {without_time:9.1f} ms"
+                f" {access_path(with_plan):>14} {with_time:9.1f} ms"
+            )
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  without: {without_plan}\n  with:    {with_plan}")
+
+    def measure(self, factory, repeat):
+        plan = factory().explain()
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(factory().values_list("pk", flat=True))
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return plan, best
+
+    # ============================
+    # SEEDING
+    # ============================
+    def seed(self, rows, batch_size, now):
+        rng = random.Random(0)
+
+        def fill(model, build):
+            for start in range(model.objects.count(), rows, batch_size):
+                with transaction.atomic():
+                    model.objects.bulk_create(build(i) for i in range(start, min(start + batch_size, rows)))
+            self.stdout.write(f"{model.__name__}: {model.objects.count()} rows")
+
+        fill(Customer, lambda i: Customer(
+            name=f"Customer {i}", email=f"bench{i}@example.com", phone=f"+1555{rng.randrange(10**7):07d}",
+        ))
+        fill(Product, lambda i: Product(
+            name=f"Product {i}", price=Decimal(rng.randrange(100, 100000)) / 100, stock=rng.randrange(1000),
+        ))
+        customer_ids = list(Customer.objects.values_list("pk", flat=True)[:rows])
+        fill(Order, lambda i: Order(
+            customer_id=rng.choice(customer_ids),
+            total_amount=Decimal(rng.randrange(100, 100000)) / 100,
+            order_date=now - timedelta(minutes=rng.randrange(525600)),
+        ))
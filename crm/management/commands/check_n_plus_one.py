@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.query_patterns import NPlusOneError, detect_queries
+
+# Nested selections over the relations that turn into N+1 when batching regresses
+OPERATIONS = {
+    "OrdersWithCustomerAndProducts": """
+        query OrdersWithCustomerAndProducts($first: Int) {
+          allOrders(first: $first) {
+            edges { node { id customer { id name email } products { id name price } } }
+          }
+        }
+    """,
+    "CustomersWithOrders": """
+        query CustomersWithOrders($first: Int) {
+          allCustomers(first: $first) {
+            edges { node { id name orders(first: 5) { edges { node { id totalAmount products { id } } } } } }
+          }
+        }
+    """,
+    "ProductsWithOrders": """
+        query ProductsWithOrders($first: Int) {
+          allProducts(first: $first) {
+            edges { node { id name orders(first: 5) { edges { node { id customer { id } } } } } }
+          }
+        }
+    """,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs nested queries over the order, customer and product relations with the "
+        "N+1 detector in strict mode and fails if any of them repeats a statement. "
+        "Needs some data in the database (see crm_import)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--first", type=int, default=20, help="Page size of the connection queries.")
+        parser.add_argument("--threshold", type=int, help="Overrides CRM_NPLUSONE_THRESHOLD.")
+        parser.add_argument("operations", nargs="*", help=f"Operations to run (default: all): {', '.join(OPERATIONS)}")
+
+    def handle(self, *args, **options):
+        from crm.schema import schema
+
+        names = options["operations"] or list(OPERATIONS)
+        unknown = set(names) - set(OPERATIONS)
+        if unknown:
+            raise CommandError(f"Unknown operations: {', '.join(sorted(unknown))}")
+
+        failures = []
+        for name in names:
+            try:
+                with detect_queries(name, mode="strict") as detector:
+                    if options["threshold"]:
+                        detector.threshold = options["threshold"]
+                    result = schema.execute(
+                        OPERATIONS[name],
+                        variable_values={"first": options["first"]},
+                        context_value=SimpleNamespace(),
+                        middleware=[detector],
+                    )
+            except NPlusOneError as e:
+                failures.append(str(e))
+                self.stdout.write(self.style.ERROR(f"{name}: N+1"))
+                continue
+            if result.errors:
+                raise CommandError(f"{name} failed: {result.errors[0].message}")
+            statements = sum(query.count for query in detector.queries.values())
+            self.stdout.write(f"{name}: {statements} statements, {len(detector.queries)} distinct")
+
+        if failures:
+            raise CommandError("\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("No repeated statements found."))
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.importer import Importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-imports customers, products and orders from CSV or NDJSON files "
+        "(in that order, so orders can reference rows imported in the same run). "
+        "Order rows reference customer_email or customer_id and product_ids (';'-separated in CSV)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", help="Customer rows: name, email, phone.")
+        parser.add_argument("--products", help="Product rows: name, price, stock.")
+        parser.add_argument("--orders", help="Order rows: customer_email|customer_id, product_ids, order_date.")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="File format (default: from the extension).")
+        parser.add_argument("--batch-size", type=int, help="Rows per bulk_create / transaction.")
+        parser.add_argument("--rejects", help="Write rejected rows to this NDJSON file instead of stderr.")
+
+    def handle(self, *args, **options):
+        if not (options["customers"] or options["products"] or options["orders"]):
+            raise CommandError("Pass at least one of --customers, --products, --orders.")
+        if options["batch_size"] is not None and options["batch_size"] <= 0:
+            raise CommandError("Batch size must be positive.")
+
+        rejects = open(options["rejects"], "w", encoding="utf-8") if options["rejects"] else None
+
+        def on_reject(label, line_number, row, message):
+            if rejects is not None:
+                rejects.write(json.dumps(
+                    {"file": label, "line": line_number, "error": message, "row": row}, default=str
+                ) + "\n")
+            else:
+                self.stderr.write(f"{label} line {line_number}: {message}")
+
+        importer = Importer(batch_size=options["batch_size"], on_reject=on_reject)
+        try:
+            results = importer.run(
+                customers=options["customers"],
+                products=options["products"],
+                orders=options["orders"],
+                file_format=options["format"],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if rejects is not None:
+                rejects.close()
+
+        for stats in results:
+            self.stdout.write(
+                f"{stats.label}: {stats.imported} imported, {stats.rejected} rejected "
+                f"in {stats.seconds:.1f}s ({stats.rows_per_second:,.0f} rows/s)"
+            )
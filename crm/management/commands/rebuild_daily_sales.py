@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from crm.models import DailySales
+from crm.rollups import rebuild_daily_sales
+from crm.signals import invalidate_caches
+
+
+class Command(BaseCommand):
+    help = "Recomputes the DailySales rollup from Order (all days, or --from/--to inclusive)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="date_to", help="Last day to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ("date_from", "date_to"):
+            if options[name]:
+                bounds[name] = parse_date(options[name])
+                if bounds[name] is None:
+                    raise CommandError(f"Invalid date: {options[name]}")
+
+        started = time.perf_counter()
+        days = rebuild_daily_sales(**bounds)
+        invalidate_caches(DailySales)
+        self.stdout.write(f"Rebuilt {days} days of sales in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+
+from crm.models import Customer, IdempotencyKey, Order, Product
+
+CREATE_ORDER = """
+mutation StressOrder($customerId: ID!, $productIds: [ID!]!, $key: String) {
+  createOrder(customerId: $customerId, productIds: $productIds, idempotencyKey: $key) {
+    order { id }
+  }
+}
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Places createOrder mutations from many threads against a few scarce products, "
+        "reports orders per second and checks that no product was oversold. "
+        "Creates its own products and customers and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--attempts", type=int, default=100, help="Orders attempted per thread.")
+        parser.add_argument("--products", type=int, default=4, help="Products competed for.")
+        parser.add_argument("--per-order", type=int, default=2, help="Products in each order.")
+        parser.add_argument("--stock", type=int, default=150, help="Starting stock of each product.")
+        parser.add_argument(
+            "--idempotency-keys", action="store_true",
+            help="Send a fresh idempotencyKey with every order and check each placed order stored its response.",
+        )
+        parser.add_argument("--keep", action="store_true", help="Keep the rows created for the run.")
+
+    def handle(self, *args, **options):
+        from crm.schema import schema
+
+        if options["per_order"] > options["products"]:
+            raise CommandError("--per-order can't exceed --products.")
+
+        run = time.time_ns()
+        products = Product.objects.bulk_create(
+            Product(name=f"stress-{run}-{i}", price=1, stock=options["stock"]) for i in range(options["products"])
+        )
+        customers = Customer.objects.bulk_create(
+            Customer(name="Stress", email=f"stress-{run}-{i}@example.com") for i in range(options["threads"])
+        )
+        product_ids = [p.pk for p in products]
+        key_prefix = f"stress-{run}-"
+
+        outcomes = Counter()
+        failures = Counter()
+        lock = threading.Lock()
+
+        def place_orders(customer, seed):
+            rng = random.Random(seed)
+            try:
+                for attempt in range(options["attempts"]):
+                    # Random order on purpose: reservations must lock by id regardless
+                    chosen = rng.sample(product_ids, options["per_order"])
+                    key = f"{key_prefix}{seed}-{attempt}" if options["idempotency_keys"] else None
+                    result = schema.execute(
+                        CREATE_ORDER,
+                        variable_values={"customerId": customer.pk, "productIds": chosen, "key": key},
+                        context_value=SimpleNamespace(),
+                    )
+                    if not result.errors:
+                        outcome = "placed"
+                    elif "Insufficient stock" in result.errors[0].message:
+                        outcome = "sold out"
+                    else:
+                        outcome = "failed"
+                    with lock:
+                        outcomes[outcome] += 1
+                        if outcome == "failed":
+                            failures[result.errors[0].message] += 1
+            finally:
+                connection.close()
+
+        # Keep restocking out of the measurement: it would refill the products mid-run
+        with override_settings(CRM_LOW_STOCK_THRESHOLD=0, CRM_RESTOCK_DEBOUNCE=0):
+            threads = [
+                threading.Thread(target=place_orders, args=(customer, n)) for n, customer in enumerate(customers)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+        try:
+            attempts = sum(outcomes.values())
+            self.stdout.write(
+                f"{options['threads']} threads, {attempts} attempts in {elapsed:.2f}s: "
+                f"{outcomes['placed']} placed ({outcomes['placed'] / elapsed:.0f} orders/s), "
+                f"{outcomes['sold out']} sold out, {outcomes['failed']} failed"
+            )
+            for message, count in failures.most_common(3):
+                self.stdout.write(f"  {count} x {message}")
+            self.check_stock(products, options["stock"], outcomes["placed"], options["per_order"])
+            if options["idempotency_keys"]:
+                self.check_keys(key_prefix, outcomes["placed"])
+        finally:
+            if not options["keep"]:
+                IdempotencyKey.objects.filter(key__startswith=key_prefix).delete()
+                Order.objects.filter(customer__in=customers).delete()
+                Customer.objects.filter(pk__in=[c.pk for c in customers]).delete()
+                Product.objects.filter(pk__in=product_ids).delete()
+
+    def check_keys(self, key_prefix, placed):
+        keys = IdempotencyKey.objects.filter(key__startswith=key_prefix)
+        stored = keys.filter(response__isnull=False).count()
+        # Sold-out attempts fail, which frees their keys for a retry
+        if stored != placed or keys.count() != placed:
+            raise CommandError(f"Idempotency check failed: {stored} stored responses, {keys.count()} keys for {placed} placed orders")
+        self.stdout.write(self.style.SUCCESS(f"Idempotency check passed: {stored} stored responses"))
+
+    def check_stock(self, products, starting_stock, placed, per_order):
+        ordered = dict(
+            Order.products.through.objects.filter(product__in=products)
+            .values_list("product_id").annotate(n=Count("pk"))
+        )
+        current = dict(Product.objects.filter(pk__in=[p.pk for p in products]).values_list("pk", "stock"))
+
+        problems = []
+        if sum(ordered.values()) != placed * per_order:
+            problems.append(f"{sum(ordered.values())} order lines for {placed} placed orders")
+        for product in products:
+            sold = ordered.get(product.pk, 0)
+            if sold > starting_stock:
+                problems.append(f"product {product.pk} oversold: {sold} sold of {starting_stock}")
+            if current[product.pk] != starting_stock - sold:
+                problems.append(f"product {product.pk}: stock {current[product.pk]}, expected {starting_stock - sold}")
+            if current[product.pk] < 0:
+                problems.append(f"product {product.pk}: negative stock {current[product.pk]}")
+
+        if problems:
+            raise CommandError("Stock check failed:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS(
+            f"Stock check passed: no oversell, remaining stock {sorted(current.values())}"
+        ))
@@ -0,0 +1,316 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+from graphql import OperationType
+
+from .auth import staff_or_bearer
+
+
+# ============================
+# REGISTRY
+# ============================
+# In-process metrics in the Prometheus text format. Each process exposes its
+# own numbers; scrape every worker (or run one per pod) to get the full picture.
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            for values, state in series:
+                lines.extend(self._sample_lines(values, state))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount, *labelvalues):
+        with self._lock:
+            self._series[labelvalues] = self._series.get(labelvalues, 0) + amount
+
+    def _sample_lines(self, values, total):
+        return [f"{self.name}{_labels(self.labelnames, values)} {total}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            state = self._series.get(labelvalues)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                state = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _sample_lines(self, values, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+            cumulative += bucket_count
+            le = bound if bound == "+Inf" else repr(float(bound))
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {total}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+operation_duration = registry.register(Histogram(
+    "crm_graphql_operation_duration_seconds", "GraphQL operation execution time.", ["operation", "type"],
+))
+operation_sql_queries = registry.register(Histogram(
+    "crm_graphql_operation_sql_queries", "SQL queries per sampled GraphQL operation.", ["operation", "type"],
+    buckets=QUERY_COUNT_BUCKETS,
+))
+operation_sql_duration = registry.register(Histogram(
+    "crm_graphql_operation_sql_duration_seconds", "SQL time per sampled GraphQL operation.", ["operation", "type"],
+))
+field_duration = registry.register(Histogram(
+    "crm_graphql_field_duration_seconds", "Resolver time per field in sampled operations.", ["field"],
+))
+field_sql_queries = registry.register(Counter(
+    "crm_graphql_field_sql_queries_total", "SQL queries run while resolving the field (innermost field wins).", ["field"],
+))
+field_sql_duration = registry.register(Counter(
+    "crm_graphql_field_sql_duration_seconds_total", "SQL time spent while resolving the field.", ["field"],
+))
+
+
+# ============================
+# RESOLVER TIMING
+# ============================
+_operation = ContextVar("crm_timed_operation", default=None)
+_field = ContextVar("crm_timed_field", default=None)
+
+
+class FieldStats:
+    __slots__ = ("calls", "seconds", "queries", "sql_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+class OperationTiming:
+    """
+    Graphene middleware timing every resolver of one sampled operation, plus
+    the SQL it runs, attributed to the innermost field whose resolver is
+    running. Querysets returned by list resolvers are evaluated inside that
+    window so their SQL counts for the field; SQL run later, such as a
+    DataLoader batch, only counts for the operation.
+    Create one per operation with observe_operation().
+    """
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.fields = {}
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def resolve(self, next, root, info, **args):
+        stats = self._stats(f"{info.parent_type.name}.{info.field_name}")
+        token = _field.set(stats)
+        start = time.perf_counter()
+        try:
+            result = next(root, info, **args)
+            if isinstance(result, QuerySet):
+                result._fetch_all()
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            _field.reset(token)
+            with self._lock:
+                stats.calls += 1
+                stats.seconds += elapsed
+
+    def _stats(self, coordinate):
+        stats = self.fields.get(coordinate)
+        if stats is None:
+            with self._lock:
+                stats = self.fields.setdefault(coordinate, FieldStats())
+        return stats
+
+    def record_sql(self, seconds):
+        field = _field.get()
+        with self._lock:
+            self.queries += 1
+            self.sql_seconds += seconds
+            if field is not None:
+                field.queries += 1
+                field.sql_seconds += seconds
+
+    def publish(self):
+        operation_sql_queries.observe(self.queries, self.name, self.kind)
+        operation_sql_duration.observe(self.sql_seconds, self.name, self.kind)
+        for coordinate, stats in self.fields.items():
+            # One observation per field and operation: the field's total resolver time
+            field_duration.observe(stats.seconds, coordinate)
+            if stats.queries:
+                field_sql_queries.inc(stats.queries, coordinate)
+                field_sql_duration.inc(stats.sql_seconds, coordinate)
+
+    def extensions(self):
+        """The `timing` response extension; durations in milliseconds, slowest fields first."""
+        fields = sorted(self.fields.items(), key=lambda item: item[1].seconds, reverse=True)
+        return {
+            "duration": round(self.seconds * 1000, 3),
+            "sqlQueries": self.queries,
+            "sqlDuration": round(self.sql_seconds * 1000, 3),
+            "fields": {
+                coordinate: {
+                    "calls": stats.calls,
+                    "duration": round(stats.seconds * 1000, 3),
+                    "sqlQueries": stats.queries,
+                    "sqlDuration": round(stats.sql_seconds * 1000, 3),
+                }
+                for coordinate, stats in fields
+            },
+        }
+
+
+def _time_sql(execute, sql, params, many, context):
+    timing = _operation.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.record_sql(time.perf_counter() - start)
+
+
+@contextmanager
+def instrument_connection():
+    """
+    Times SQL run on this thread's connection for the enclosing observe_operation().
+    Worker threads that inherit the caller's context (sync_to_async) enter this
+    themselves, since execute wrappers are per connection and so per thread.
+    """
+    if _operation.get() is None:
+        yield
+        return
+    with connection.execute_wrapper(_time_sql):
+        yield
+
+
+def metrics_allowed(request):
+    """True for staff users and for requests bearing CRM_METRICS_TOKEN."""
+    return staff_or_bearer(request, getattr(settings, "CRM_METRICS_TOKEN", ""))
+
+
+def debug_requested(request):
+    """True when the request asks for the `timing` extension and may see it."""
+    header = getattr(settings, "CRM_METRICS_DEBUG_HEADER", "X-CRM-Timing")
+    if not header or not request.headers.get(header):
+        return False
+    user = getattr(request, "user", None)
+    return settings.DEBUG or bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+# Operation names are client-chosen, so only known ones become label values:
+# CRM_METRICS_OPERATIONS, plus the first CRM_METRICS_MAX_OPERATIONS names of
+# persisted queries this process ran. Everything else is labelled "other".
+_persisted_names = set()
+_persisted_names_lock = threading.Lock()
+
+
+def operation_label(operation_ast, operation_name, persisted=False):
+    """The (operation, type) label values of an operation."""
+    kind = operation_ast.operation.value if operation_ast is not None else OperationType.QUERY.value
+    name = operation_name or (operation_ast.name.value if operation_ast is not None and operation_ast.name else None)
+    if name is None:
+        return "anonymous", kind
+    if name in getattr(settings, "CRM_METRICS_OPERATIONS", ()):
+        return name, kind
+    if persisted:
+        with _persisted_names_lock:
+            if name in _persisted_names or len(_persisted_names) < getattr(settings, "CRM_METRICS_MAX_OPERATIONS", 100):
+                _persisted_names.add(name)
+                return name, kind
+    return "other", kind
+
+
+@contextmanager
+def observe_operation(request, operation_ast, operation_name, persisted=False):
+    """
+    Times one operation. Yields its OperationTiming (to add as middleware)
+    when the operation is sampled or debug timing was requested, else None.
+    Every operation's duration is recorded; fields and SQL only when sampled.
+    """
+    name, kind = operation_label(operation_ast, operation_name, persisted)
+    rate = getattr(settings, "CRM_METRICS_SAMPLE_RATE", 0.1)
+    sampled = debug_requested(request) or (rate > 0 and random.random() < rate)
+
+    timing = OperationTiming(name, kind) if sampled else None
+    token = _operation.set(timing)
+    start = time.perf_counter()
+    try:
+        with instrument_connection():
+            yield timing
+    finally:
+        elapsed = time.perf_counter() - start
+        _operation.reset(token)
+        operation_duration.observe(elapsed, name, kind)
+        if timing is not None:
+            timing.seconds = elapsed
+            timing.publish()
@@ -1,10 +1,38 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+
+class PrefixIndex(models.Index):
+    """
+    B-tree index usable by `__startswith` (LIKE 'x%') lookups: pattern ops on
+    PostgreSQL, NOCASE collation on SQLite (where Django's LIKE is case-insensitive).
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        vendor = schema_editor.connection.vendor
+        if vendor == "postgresql":
+            index = models.Index(fields=self.fields, name=self.name, opclasses=["varchar_pattern_ops"] * len(self.fields))
+        elif vendor == "sqlite":
+            index = models.Index(*(Collate(F(field), "NOCASE") for field in self.fields), name=self.name)
+        else:
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        return index.create_sql(model, schema_editor, using=using, **kwargs)
+
 
 class Customer(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # CustomerFilter.phone_pattern is a prefix (startswith) lookup
+            PrefixIndex(fields=['phone'], name='customer_phone_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -14,15 +42,89 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['stock'], name='product_stock_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Order(models.Model):
+    STATUS_PENDING = 'PENDING'
+    STATUS_COMPLETED = 'COMPLETED'
+    STATUS_CANCELLED = 'CANCELLED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='orders')
     products = models.ManyToManyField(Product, related_name='orders')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    order_date = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so imported and back-dated orders keep their date
+    order_date = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    class Meta:
+        indexes = [
+            # order_date ranges and the (order_date, id) keyset cursor
+            models.Index(fields=['order_date', 'id'], name='order_date_id_idx'),
+            models.Index(fields=['total_amount'], name='order_total_amount_idx'),
+            # Keyset pages over one status (the reminder pipeline's pending orders)
+            models.Index(fields=['status', 'order_date', 'id'], name='order_status_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.customer.name}"
+
+
+class DailySales(models.Model):
+    """Per-day order rollup (days in TIME_ZONE), maintained by crm/rollups.py."""
+    date = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    customer_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.order_count} orders, {self.revenue}"
+
+
+class ReminderCheckpoint(models.Model):
+    """Where a reminder job stopped (a keyset cursor) and how its last run went."""
+    name = models.CharField(max_length=100, unique=True)
+    cursor = models.TextField(blank=True, default='')
+    # Orders on the page after `cursor` that were already reminded about
+    sent_order_ids = models.JSONField(blank=True, default=list)
+    orders_processed = models.PositiveIntegerField(default=0)
+    reminders_sent = models.PositiveIntegerField(default=0)
+    reminders_failed = models.PositiveIntegerField(default=0)
+    duration = models.FloatField(default=0)  # Seconds
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class RestockRequest(models.Model):
+    """A product that fell below the low-stock threshold, waiting for the restock task (crm/low_stock.py)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='restock_requests')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Restock product {self.product_id}"
+
+
+class IdempotencyKey(models.Model):
+    """Result of a mutation run with an idempotencyKey, replayed to retries until it expires (crm/idempotency.py)."""
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64)  # sha256 of the operation, its arguments and the viewer
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)  # NULL while the first request runs
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,175 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import cmp_to_key, reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+import graphene
+from graphene.relay import Connection, PageInfo
+from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+
+from .counting import count_queryset
+
+
+# ============================
+# CURSORS
+# ============================
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder truncates datetimes to milliseconds; cursors need exact values.
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    data = json.dumps(list(values), cls=CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor, keys):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [field.to_python(value) for (_, _, field), value in zip(keys, values)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        raise ValidationError(f"Invalid cursor: {cursor}")
+
+
+def keyset_keys(model, ordering):
+    """Turns ("order_date", "-pk") into [(field name, descending, model field), ...]."""
+    keys = []
+    for name in ordering:
+        descending = name.startswith("-")
+        name = name.lstrip("-")
+        field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        keys.append((field.name, descending, field))
+    return keys
+
+
+def _row_values(obj, keys):
+    return [getattr(obj, field.attname) for _, _, field in keys]
+
+
+def _seek(keys, values, forward):
+    """(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...; comparisons flip for descending keys."""
+    clauses = []
+    for i, (name, descending, _) in enumerate(keys):
+        lookup = "gt" if forward != descending else "lt"
+        equal = {keys[j][0]: values[j] for j in range(i)}
+        clauses.append(Q(**equal, **{f"{name}__{lookup}": values[i]}))
+    return reduce(or_, clauses)
+
+
+def _compare(keys, a, b):
+    for (_, descending, _), x, y in zip(keys, a, b):
+        if x != y:
+            return (1 if x > y else -1) * (-1 if descending else 1)
+    return 0
+
+
+# ============================
+# KEYSET PAGINATION
+# ============================
+def paginate(iterable, keys, first=None, after=None, last=None, before=None):
+    """
+    Returns (rows, has_previous_page, has_next_page) using keyset seeks:
+    WHERE (keys) > after ORDER BY keys LIMIT first + 1.
+    Already evaluated querysets (e.g. prefetched relations) are paginated in memory.
+    """
+    after_values = decode_cursor(after, keys) if after else None
+    before_values = decode_cursor(before, keys) if before else None
+    backwards = last is not None and first is None
+    limit = last if backwards else first
+
+    queryset = maybe_queryset(iterable)
+    if getattr(queryset, "_result_cache", None) is None:
+        ordering = [("-" if desc != backwards else "") + name for name, desc, _ in keys]
+        queryset = queryset.order_by(*ordering)
+        if after_values is not None:
+            queryset = queryset.filter(_seek(keys, after_values, forward=True))
+        if before_values is not None:
+            queryset = queryset.filter(_seek(keys, before_values, forward=False))
+        rows = list(queryset if limit is None else queryset[:limit + 1])
+    else:
+        compare = cmp_to_key(lambda a, b: _compare(keys, _row_values(a, keys), _row_values(b, keys)))
+        rows = sorted(queryset, key=compare, reverse=backwards)
+        if after_values is not None:
+            rows = [r for r in rows if _compare(keys, _row_values(r, keys), after_values) > 0]
+        if before_values is not None:
+            rows = [r for r in rows if _compare(keys, _row_values(r, keys), before_values) < 0]
+        if limit is not None:
+            rows = rows[:limit + 1]
+
+    more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if limit is not None else rows
+    if backwards:
+        rows.reverse()
+        return rows, more, before_values is not None
+
+    has_previous = after_values is not None
+    if last is not None and len(rows) > last:
+        rows = rows[-last:]
+        has_previous = True
+    return rows, has_previous, more
+
+
+class CountableConnection(Connection):
+    """Connection with a totalCount from the shared count cache when configured (or table statistics when estimated)."""
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int(estimated=graphene.Boolean(default_value=False))
+
+    def resolve_total_count(root, info, estimated=False):
+        return count_queryset(root.iterable, estimated=estimated)
+
+
+class KeysetConnectionField(DjangoFilterConnectionField):
+    """
+    Filter connection paginated by keyset instead of OFFSET/LIMIT, so every page
+    costs the same. Cursors encode the node type's `keyset_ordering` (default: pk).
+    """
+
+    @classmethod
+    def ordering_keys(cls, connection, queryset):
+        return keyset_keys(queryset.model, getattr(connection._meta.node, "keyset_ordering", ("pk",)))
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        if args.get("offset"):
+            raise ValidationError("offset is not supported on this connection; use after/before cursors.")
+
+        first = args.get("first")
+        last = args.get("last")
+        if first is None and last is None:
+            first = max_limit
+
+        queryset = maybe_queryset(iterable)
+        keys = cls.ordering_keys(connection, queryset)
+        rows, has_previous, has_next = paginate(
+            queryset, keys, first=first, after=args.get("after"), last=last, before=args.get("before")
+        )
+
+        edges = [
+            connection.Edge(node=row, cursor=encode_cursor(_row_values(row, keys)))
+            for row in rows
+        ]
+        resolved = connection(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous,
+                has_next_page=has_next,
+            ),
+        )
+        resolved.iterable = queryset
+        return resolved
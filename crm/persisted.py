@@ -0,0 +1,84 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql import parse, validate
+from graphql.error import GraphQLError
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+# ============================
+# PARSED DOCUMENT CACHE
+# ============================
+class DocumentCache:
+    """Bounded, thread-safe LRU of parsed and validated documents keyed by query hash."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+            return document
+
+    def set(self, key, document):
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+documents = DocumentCache(getattr(settings, "CRM_DOCUMENT_CACHE_SIZE", 500))
+
+
+def get_document(schema, query, validation_rules=None, key=None):
+    """
+    Returns (document, errors). Only documents that parse and validate are cached,
+    so a hit skips both steps.
+    """
+    key = key or query_hash(query)
+    cache_key = (id(schema), id(validation_rules), key)
+    document = documents.get(cache_key)
+    if document is not None:
+        return document, []
+
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        return None, [e]
+
+    errors = validate(schema, document, validation_rules)
+    if errors:
+        return None, errors
+
+    documents.set(cache_key, document)
+    return document, []
+
+
+# ============================
+# PERSISTED QUERY STORE
+# ============================
+def _store():
+    return caches[getattr(settings, "CRM_PERSISTED_QUERY_CACHE", "default")]
+
+
+def save_persisted_query(sha256, query):
+    _store().set(f"crm:apq:{sha256}", query, getattr(settings, "CRM_PERSISTED_QUERY_TIMEOUT", None))
+
+
+def load_persisted_query(sha256):
+    return _store().get(f"crm:apq:{sha256}")
@@ -0,0 +1,129 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.registry import get_global_registry
+from graphene_django.utils import maybe_queryset
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+# ============================
+# SELECTION SET HELPERS
+# ============================
+def collect_fields(field_nodes, fragments):
+    """
+    Merges the sub-selections of the given field nodes into
+    {graphql field name: [FieldNode, ...]}, expanding fragments.
+    """
+    fields = {}
+
+    def visit(selection_set):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.setdefault(selection.name.value, []).append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                visit(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = fragments.get(selection.name.value)
+                if fragment is not None:
+                    visit(fragment.selection_set)
+
+    for node in field_nodes:
+        visit(node.selection_set)
+    return fields
+
+
+def node_fields(field_nodes, fragments):
+    """Same as collect_fields, but looks through relay `edges { node { ... } }` wrappers."""
+    fields = collect_fields(field_nodes, fragments)
+    if "edges" in fields:
+        edges = collect_fields(fields["edges"], fragments)
+        fields = collect_fields(edges.get("node", []), fragments)
+    return fields
+
+
+def _model_field(model, graphql_name):
+    try:
+        return model._meta.get_field(to_snake_case(graphql_name))
+    except FieldDoesNotExist:
+        return None
+
+
+# ============================
+# PLANNER
+# ============================
+def _plan(model, fields, fragments, prefix=""):
+    """
+    Returns (only, select_related, prefetch) for the given selection on `model`.
+    Foreign-key and keyset cursor columns are always kept so loaders, relation
+    descriptors and cursors never fall back to a deferred-field query per row.
+    """
+    only = {prefix + model._meta.pk.name}
+    select_related = []
+    prefetch = []
+
+    for field in model._meta.concrete_fields:
+        if field.is_relation:
+            only.add(prefix + field.name)
+
+    # Keyset cursors read these columns for every row
+    node_type = get_global_registry().get_type_for_model(model)
+    for name in getattr(node_type, "keyset_ordering", ()):
+        name = name.lstrip("-")
+        only.add(prefix + (model._meta.pk.name if name == "pk" else name))
+
+    for name, nodes in fields.items():
+        field = _model_field(model, name)
+        if field is None:
+            continue
+
+        if field.many_to_many or field.one_to_many:
+            child_model = field.related_model
+            child_fields = node_fields(nodes, fragments)
+            child_only, child_related, child_prefetch = _plan(child_model, child_fields, fragments)
+            if field.one_to_many:
+                # Reverse FK: the child needs its FK column to be matched to the parent.
+                child_only.add(field.field.name)
+            queryset = _apply(child_model._default_manager.all(), child_only, child_related, child_prefetch)
+            prefetch.append(Prefetch(prefix + field.name, queryset=queryset))
+
+        elif field.many_to_one or field.one_to_one:
+            if not field.concrete:
+                continue
+            related_fields = collect_fields(nodes, fragments)
+            rel_only, rel_related, rel_prefetch = _plan(
+                field.related_model, related_fields, fragments, prefix + field.name + "__"
+            )
+            only |= rel_only
+            select_related.append(prefix + field.name)
+            select_related.extend(rel_related)
+            prefetch.extend(rel_prefetch)
+
+        elif field.concrete:
+            only.add(prefix + field.name)
+
+    return only, select_related, prefetch
+
+
+def _apply(queryset, only, select_related, prefetch):
+    # select_related() with no arguments would follow every FK, so only call it when needed.
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*only)
+
+
+def plan_queryset(queryset, info):
+    """
+    Applies select_related / prefetch_related / only() to `queryset`
+    based on what the client selected under the field being resolved.
+    """
+    queryset = maybe_queryset(queryset)
+    # Already evaluated (e.g. prefetched by a parent plan): leave it alone.
+    if getattr(queryset, "_result_cache", None) is not None:
+        return queryset
+
+    fields = node_fields(info.field_nodes, info.fragments)
+    return _apply(queryset, *_plan(queryset.model, fields, info.fragments))
@@ -0,0 +1,191 @@
+import logging
+import random
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+
+# ============================
+# N+1 DETECTION
+# ============================
+# Watches the SQL of one GraphQL operation and flags statements that run
+# many times with only their parameters changing, which is what an N+1
+# looks like from the database: the same SELECT once per parent row.
+#
+# CRM_NPLUSONE_MODE:
+#   "strict" - raise NPlusOneError after the operation (use it in tests and CI);
+#              the GraphQL view returns the findings in `extensions.nPlusOne` instead
+#   "log"    - log a warning for a CRM_NPLUSONE_SAMPLE_RATE share of operations
+#   "off"    - don't watch
+n_plus_one_detected = registry.register(Counter(
+    "crm_graphql_n_plus_one_total", "Repeated SQL statements flagged by the N+1 detector.", ["operation", "field"],
+))
+
+_detector = ContextVar("crm_query_detector", default=None)
+_resolving = ContextVar("crm_resolver_info", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?|\$\d+")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES \(([?, ]*)\)(?:, \(\1\))+", re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """SQL with literals, placeholders and IN/VALUES lists collapsed, so only the statement's shape remains."""
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _VALUES_LIST.sub(r"VALUES (\1)", sql)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class RepeatedQuery:
+    # paths: resolver path -> count, for reports; fields: schema coordinate -> count,
+    # for the metric (paths carry client aliases, so they can't be label values)
+    __slots__ = ("sql", "count", "paths", "fields")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.paths = {}
+        self.fields = {}
+
+    def as_dict(self):
+        return {"statement": self.sql, "count": self.count, "paths": self.paths}
+
+    def describe(self):
+        paths = sorted(self.paths.items(), key=lambda item: item[1], reverse=True)
+        where = ", ".join(f"{path} ({count}x)" for path, count in paths[:3])
+        return f"{self.count}x {self.sql[:300]}\n    from {where}"
+
+
+class QueryDetector:
+    """
+    Counts the normalized SQL of one operation by fingerprint, along with the
+    resolver path that ran it. Also graphene middleware: add it to the
+    operation's middleware so statements are attributed to resolver paths
+    (list indexes shown as `*`). Create one per operation with detect_queries().
+    """
+
+    def __init__(self, operation, threshold):
+        self.operation = operation
+        self.threshold = threshold
+        self.queries = {}
+        self.findings = []  # Set by detect_queries(raise_errors=False) in strict mode
+        self._lock = threading.Lock()
+
+    def resolve(self, next, root, info, **args):
+        token = _resolving.set(info)
+        try:
+            return next(root, info, **args)
+        finally:
+            _resolving.reset(token)
+
+    def record(self, sql):
+        # Only reads repeat per parent row; transaction control and chunked writes
+        # (BEGIN/SAVEPOINT, batched INSERTs) legitimately run many times
+        if sql.lstrip()[:6].upper() != "SELECT":
+            return
+        info = _resolving.get()
+        if info is None:
+            path = field = "(root)"
+        else:
+            path = ".".join("*" if isinstance(key, int) else key for key in info.path.as_list())
+            field = f"{info.parent_type.name}.{info.field_name}"
+        fingerprint = normalize_sql(sql)
+        with self._lock:
+            query = self.queries.get(fingerprint)
+            if query is None:
+                query = self.queries[fingerprint] = RepeatedQuery(fingerprint)
+            query.count += 1
+            query.paths[path] = query.paths.get(path, 0) + 1
+            query.fields[field] = query.fields.get(field, 0) + 1
+
+    def repeated(self):
+        """Statements that ran at least `threshold` times, most frequent first."""
+        flagged = [query for query in self.queries.values() if query.count >= self.threshold]
+        return sorted(flagged, key=lambda query: query.count, reverse=True)
+
+    def report(self):
+        return f"Possible N+1 in operation {self.operation}:\n  " + "\n  ".join(
+            query.describe() for query in self.repeated()
+        )
+
+
+def _watch_sql(execute, sql, params, many, context):
+    detector = _detector.get()
+    if detector is not None:
+        detector.record(sql)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def watch_connection():
+    """
+    Feeds SQL run on this thread's connection to the enclosing detect_queries().
+    Worker threads that inherit the caller's context (sync_to_async) enter this
+    themselves, like metrics.instrument_connection().
+    """
+    if _detector.get() is None:
+        yield
+        return
+    with connection.execute_wrapper(_watch_sql):
+        yield
+
+
+@contextmanager
+def detect_queries(operation="anonymous", mode=None, raise_errors=True):
+    """
+    Watches one operation for repeated SELECTs. Yields its QueryDetector
+    (to add as middleware), or None when this operation isn't watched.
+    In strict mode NPlusOneError is raised on exit, or with raise_errors=False
+    the repeated queries are left in detector.findings for the caller to
+    report; otherwise findings are logged.
+
+        with detect_queries("Orders", mode="strict") as detector:
+            schema.execute(query, middleware=[detector])
+    """
+    mode = mode or getattr(settings, "CRM_NPLUSONE_MODE", "log")
+    if mode == "log":
+        watched = random.random() < getattr(settings, "CRM_NPLUSONE_SAMPLE_RATE", 0.05)
+    else:
+        watched = mode == "strict"
+    if not watched:
+        yield None
+        return
+
+    detector = QueryDetector(operation, getattr(settings, "CRM_NPLUSONE_THRESHOLD", 5))
+    token = _detector.set(detector)
+    try:
+        with watch_connection():
+            yield detector
+    finally:
+        _detector.reset(token)
+
+    repeated = detector.repeated()
+    if not repeated:
+        return
+    for query in repeated:
+        for field, count in query.fields.items():
+            n_plus_one_detected.inc(count, operation, field)
+    if mode == "strict":
+        if raise_errors:
+            raise NPlusOneError(detector.report())
+        detector.findings = repeated
+        return
+    logger.warning(detector.report())
@@ -0,0 +1,215 @@
+import abc
+import logging
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from graphene_django.settings import graphene_settings
+from graphql_relay import from_global_id
+
+from .executor import Operation
+from .models import ReminderCheckpoint
+
+logger = logging.getLogger(__name__)
+
+Reminder = namedtuple("Reminder", ["customer_id", "email", "order_ids"])
+
+
+# ============================
+# SENDERS
+# ============================
+class ReminderSender(abc.ABC):
+    """Delivers one reminder; raise to report a failed delivery. Called from worker threads."""
+
+    @abc.abstractmethod
+    def send(self, reminder):
+        """Delivers `reminder`, a Reminder(customer_id, email, order_ids)."""
+
+
+class FileSender(ReminderSender):
+    """Local stand-in for a mail/SMS provider: appends one line per reminder."""
+
+    def __init__(self, path="/tmp/order_reminders_log.txt"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, reminder):
+        timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
+        line = f"{timestamp} - Customer Email: {reminder.email}, Order IDs: {', '.join(map(str, reminder.order_ids))}\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+class ConsoleSender(ReminderSender):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send(self, reminder):
+        with self._lock:
+            self.stream.write(f"Reminder to {reminder.email}: pending orders {', '.join(map(str, reminder.order_ids))}\n")
+
+
+def get_sender():
+    return import_string(getattr(settings, "CRM_REMINDER_SENDER", "crm.reminders.FileSender"))()
+
+
+class RateLimiter:
+    """Spaces calls from any number of threads to at most `rate` per second (0 = unlimited)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+# ============================
+# PIPELINE
+# ============================
+# Pending orders, oldest first, keyset-paged on OrderType's (order_date, id) cursor
+PENDING_ORDERS = Operation(
+    """
+    query PendingOrders($since: Date!, $first: Int!, $after: String) {
+      allOrders(status: "PENDING", orderDate_Gte: $since, first: $first, after: $after) {
+        edges {
+          node {
+            id
+            customer {
+              id
+              email
+            }
+          }
+        }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+      }
+    }
+    """
+)
+
+
+class ReminderStats:
+    def __init__(self):
+        self.orders = 0
+        self.sent = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.pages = 0
+        self.seconds = 0.0
+
+    @property
+    def reminders_per_second(self):
+        return self.sent / self.seconds if self.seconds else float(self.sent)
+
+
+def group_by_customer(nodes, sent=()):
+    """
+    One reminder per customer on the page, with the order pks not in `sent`;
+    returns (reminders, duplicates).
+    """
+    grouped = {}
+    duplicates = 0
+    for node in nodes:
+        order_id = int(from_global_id(node["id"])[1])
+        customer_id = int(from_global_id(node["customer"]["id"])[1])
+        if order_id in sent:
+            duplicates += 1
+            continue
+        if customer_id in grouped:
+            duplicates += 1
+            grouped[customer_id].order_ids.append(order_id)
+        else:
+            grouped[customer_id] = Reminder(customer_id, node["customer"]["email"], [order_id])
+    return list(grouped.values()), duplicates
+
+
+def send_order_reminders(sender=None, days=None, page_size=None, workers=None, rate=None,
+                         checkpoint="order_reminders", full=False):
+    """
+    Sends one reminder per customer and page of pending orders from the last
+    `days` days, resuming after the checkpoint's cursor unless `full` is set.
+    Each order is reminded about once, whether or not the run restarts: only
+    the persisted cursor and the checkpoint's sent orders decide. Each page is
+    delivered by a bounded thread pool under a shared rate limit; the cursor only
+    moves past a page once all of its reminders were delivered. The orders of a
+    page that failed part-way are kept with the checkpoint, so the retry only
+    reminds about the rest.
+    """
+    sender = sender or get_sender()
+    days = days or getattr(settings, "CRM_REMINDER_WINDOW_DAYS", 7)
+    page_size = page_size or getattr(settings, "CRM_REMINDER_PAGE_SIZE", 100)
+    page_size = min(page_size, graphene_settings.RELAY_CONNECTION_MAX_LIMIT or page_size)
+    workers = workers or getattr(settings, "CRM_REMINDER_WORKERS", 4)
+    limiter = RateLimiter(getattr(settings, "CRM_REMINDER_RATE_LIMIT", 20) if rate is None else rate)
+
+    state, _ = ReminderCheckpoint.objects.get_or_create(name=checkpoint)
+    after = None if full else (state.cursor or None)
+    sent = set() if full else set(state.sent_order_ids)
+    since = (timezone.now() - timedelta(days=days)).date().isoformat()
+
+    def deliver(reminder):
+        limiter.acquire()
+        sender.send(reminder)
+
+    stats = ReminderStats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            page = PENDING_ORDERS.execute({"since": since, "first": page_size, "after": after})["allOrders"]
+            nodes = [edge["node"] for edge in page["edges"]]
+            reminders, duplicates = group_by_customer(nodes, sent)
+
+            failed = 0
+            for reminder, future in [(r, pool.submit(deliver, r)) for r in reminders]:
+                try:
+                    future.result()
+                    sent.update(reminder.order_ids)
+                    stats.sent += 1
+                except Exception:
+                    logger.exception("Reminder to %s failed", reminder.email)
+                    failed += 1
+
+            stats.pages += 1
+            stats.orders += len(nodes)
+            stats.duplicates += duplicates
+            stats.failed += failed
+            if failed:
+                # Leave the cursor before this page so the next run retries it,
+                # skipping the orders that were already reminded about
+                state.sent_order_ids = sorted(sent)
+                state.save(update_fields=["sent_order_ids", "updated_at"])
+                break
+            if page["pageInfo"]["endCursor"]:
+                after = page["pageInfo"]["endCursor"]
+                state.cursor = after
+                state.sent_order_ids = []
+                sent = set()
+                state.save(update_fields=["cursor", "sent_order_ids", "updated_at"])
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+
+    stats.seconds = time.perf_counter() - started
+    state.orders_processed = stats.orders
+    state.reminders_sent = stats.sent
+    state.reminders_failed = stats.failed
+    state.duration = stats.seconds
+    state.save()
+    return stats
@@ -0,0 +1,25 @@
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from .models import Customer
+
+
+def crm_stats(date_from=None, date_to=None):
+    """
+    Customer count, order count and revenue computed by the database in one
+    aggregate query. Orders (and revenue) can be bounded by an order_date window.
+    """
+    window = Q()
+    if date_from is not None:
+        window &= Q(orders__order_date__gte=date_from)
+    if date_to is not None:
+        window &= Q(orders__order_date__lte=date_to)
+
+    stats = Customer.objects.aggregate(
+        customer_count=Count("pk", distinct=True),
+        order_count=Count("orders", filter=window),
+        revenue=Sum("orders__total_amount", filter=window),
+    )
+    stats["revenue"] = stats["revenue"] or Decimal("0")
+    return stats
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+
+# ============================
+# TABLE TRACKING
+# ============================
+# Tables read while an operation executes; used as the cache entry's tags.
+_touched_tables = ContextVar("crm_touched_tables", default=None)
+_table_pattern = None
+
+
+def crm_tables():
+    """db_table of every crm model, M2M through tables included."""
+    config = apps.get_app_config("crm")
+    return sorted(model._meta.db_table for model in config.get_models(include_auto_created=True))
+
+
+def record_tables(tables):
+    touched = _touched_tables.get()
+    if touched is not None:
+        touched.update(tables)
+
+
+def _record_sql(execute, sql, params, many, context):
+    global _table_pattern
+    if _table_pattern is None:
+        _table_pattern = re.compile(r"\b(%s)\b" % "|".join(map(re.escape, crm_tables())))
+    record_tables(_table_pattern.findall(sql))
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def track_tables():
+    """Collects the crm tables read by SQL (and by count cache hits) inside the block."""
+    touched = set()
+    token = _touched_tables.set(touched)
+    try:
+        with track_connection():
+            yield touched
+    finally:
+        _touched_tables.reset(token)
+
+
+@contextmanager
+def track_connection():
+    """
+    Records SQL run on this thread's connection into the enclosing track_tables().
+    Worker threads that inherit the caller's context (sync_to_async) enter this
+    themselves, since execute wrappers are per connection and so per thread.
+    """
+    if _touched_tables.get() is None:
+        yield
+        return
+    with connection.execute_wrapper(_record_sql):
+        yield
+
+
+# ============================
+# RESPONSE CACHE
+# ============================
+class ResponseCache:
+    """
+    Read-through cache of query results on top of any Django cache backend
+    (LocMemCache by default, Redis/Memcached for several processes).
+    Each entry remembers the generation of every table it read; a write to one
+    of those tables bumps the generation (see crm/signals.py) and the entry
+    stops matching.
+    """
+
+    prefix = "crm:response"
+
+    def __init__(self, alias="default", timeout=60):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def _generation_key(self, table):
+        return f"{self.prefix}:gen:{table}"
+
+    def generations(self, tables):
+        keys = {table: self._generation_key(table) for table in tables}
+        current = self.cache.get_many(list(keys.values()))
+        return {table: current.get(key, 0) for table, key in keys.items()}
+
+    def invalidate(self, tables):
+        for table in tables:
+            try:
+                self.cache.incr(self._generation_key(table))
+            except ValueError:
+                self.cache.set(self._generation_key(table), 1, None)
+
+    def make_key(self, operation_hash, variables, operation_name, viewer):
+        payload = json.dumps([operation_hash, variables or {}, operation_name, viewer], sort_keys=True, default=str)
+        return f"{self.prefix}:" + hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if self.generations(entry["generations"]) != entry["generations"]:
+            return None
+        return entry["data"]
+
+    def set(self, key, data, generations):
+        self.cache.set(key, {"data": data, "generations": generations}, self.timeout)
+
+
+def get_response_cache():
+    """The configured ResponseCache, or None when the cache is disabled (the default)."""
+    if not getattr(settings, "CRM_RESPONSE_CACHE_ENABLED", False):
+        return None
+    return ResponseCache(
+        alias=getattr(settings, "CRM_RESPONSE_CACHE", "default"),
+        timeout=getattr(settings, "CRM_RESPONSE_CACHE_TIMEOUT", 60),
+    )
+
+
+def invalidate_responses(*models):
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate(model._meta.db_table for model in models)
+
+
+def get_viewer(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return str(user.pk)
+    return "anonymous"
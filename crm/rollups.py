@@ -0,0 +1,112 @@
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySales, Order
+
+
+# ============================
+# DAILY SALES
+# ============================
+# Days are calendar days in the current time zone (TIME_ZONE), like TruncDate.
+
+def order_day(order):
+    return timezone.localdate(order.order_date)
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+
+
+def record_order(order):
+    """
+    Adds a newly created order to its day with F() increments. Two first orders
+    from one customer on the same day that commit before either is recorded each
+    see the other and count the customer 0 times; rebuild_daily_sales() corrects that.
+    """
+    day = order_day(order)
+    start, end = day_bounds(day)
+    repeat_customer = (
+        Order.objects.filter(customer_id=order.customer_id, order_date__gte=start, order_date__lt=end)
+        .exclude(pk=order.pk)
+        .exists()
+    )
+    DailySales.objects.get_or_create(date=day)
+    DailySales.objects.filter(date=day).update(
+        order_count=F("order_count") + 1,
+        revenue=F("revenue") + order.total_amount,
+        customer_count=F("customer_count") + (0 if repeat_customer else 1),
+    )
+
+
+def refresh_days(days):
+    """
+    Recomputes the given days from Order. Used after deletions (a cascade deletes
+    every order before any post_delete fires, so decrements can't tell which
+    customers are still active that day) and after bulk writes that skip signals.
+    """
+    for day in sorted(set(days)):
+        start, end = day_bounds(day)
+        totals = Order.objects.filter(order_date__gte=start, order_date__lt=end).aggregate(
+            order_count=Count("pk"),
+            revenue=Sum("total_amount"),
+            customer_count=Count("customer", distinct=True),
+        )
+        if totals["order_count"]:
+            DailySales.objects.update_or_create(date=day, defaults=totals)
+        else:
+            DailySales.objects.filter(date=day).delete()
+
+
+def rebuild_daily_sales(date_from=None, date_to=None):
+    """
+    Replaces the rollup rows between date_from and date_to (inclusive, open-ended
+    when None) with one GROUP BY over Order. Returns the number of days written.
+    """
+    orders = Order.objects.all()
+    rows = DailySales.objects.all()
+    if date_from is not None:
+        orders = orders.filter(order_date__gte=day_bounds(date_from)[0])
+        rows = rows.filter(date__gte=date_from)
+    if date_to is not None:
+        orders = orders.filter(order_date__lt=day_bounds(date_to)[1])
+        rows = rows.filter(date__lte=date_to)
+
+    totals = (
+        orders.annotate(day=TruncDate("order_date"))
+        .values("day")
+        .annotate(
+            order_count=Count("pk"),
+            revenue=Sum("total_amount"),
+            customer_count=Count("customer", distinct=True),
+        )
+        .order_by("day")
+    )
+    with transaction.atomic():
+        rows.delete()
+        created = DailySales.objects.bulk_create(
+            DailySales(
+                date=row["day"],
+                order_count=row["order_count"],
+                revenue=row["revenue"] or 0,
+                customer_count=row["customer_count"],
+            )
+            for row in totals.iterator()
+        )
+    return len(created)
+
+
+def sales_by_day(date_from, date_to):
+    """One DailySales (unsaved zeros for days without orders) per day from date_from to date_to."""
+    stored = {row.date: row for row in DailySales.objects.filter(date__range=(date_from, date_to))}
+    days = []
+    day = date_from
+    while day <= date_to:
+        days.append(stored.get(day) or DailySales(date=day, order_count=0, revenue=Decimal("0"), customer_count=0))
+        day += datetime.timedelta(days=1)
+    return days
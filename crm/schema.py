@@ -1,85 +1,24 @@
 import graphene
-from graphene_django import DjangoObjectType
+from graphene_django import DjangoObjectType, DjangoListField
+from graphene_django.utils import bypass_get_queryset
 from .models import Customer, Product, Order
+from django.conf import settings
 from django.db import transaction, IntegrityError
-from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-from graphene_django.filter import DjangoFilterConnectionField
-from datetime import datetime
 from django.utils import timezone
-from graphene_django.filter import DjangoFilterConnectionField
 from graphene import relay
 from .filters import CustomerFilter, ProductFilter, OrderFilter
-from .types import CustomerType, ProductType, OrderType 
-import re
-from crm.models import Product
+from .idempotency import idempotent, store_response
+from .loaders import get_loaders, OrderConnectionField
+from .pagination import CountableConnection, KeysetConnectionField
+from .planner import plan_queryset
+from .reports import crm_stats
+from .rollups import sales_by_day
+from .search import SearchConnectionField
+from .signals import invalidate_caches
+from .stock import reserve_stock, restock_low_stock
+from .validators import PHONE_PATTERN, validate_phone, validate_product
 
-# ----------------------------
-# DjangoObjectType Definitions
-# ----------------------------
-class CustomerType(DjangoObjectType):
-    class Meta:
-        model = Customer
-        fields = ("id", "name", "email", "phone")
-
-
-class ProductType(DjangoObjectType):
-    class Meta:
-        model = Product
-        fields = ("id", "name", "price", "stock")
-
-
-class OrderType(DjangoObjectType):
-    class Meta:
-        model = Order
-        fields = ("id", "customer", "products", "total_amount", "order_date")
-
-
-# ----------------------------
-# CreateCustomer Mutation# ----------------------------
-class CreateCustomer(graphene.Mutation):
-    class Arguments:
-        name = graphene.String(required=True)
-        email = graphene.String(required=True)
-        phone = graphene.String(required=False)
-
-    customer = graphene.Field(CustomerType)
-    message = graphene.String()
-
-    def mutate(self, info, name, email, phone=None):
-        # Email validation
-        try:
-            validate_email(email)
-        except ValidationError:
-            raise Exception("Invalid email format")
-
-        # Check unique email
-        if Customer.objects.filter(email=email).exists():
-            raise Exception("Email already exists")
-
-        # Optional phone validation
-        if phone and not (phone.startswith("+") or phone.replace("-", "").isdigit()):
-            raise Exception("Invalid phone format")
-
-        customer = Customer.objects.create(name=name, email=email, phone=phone)
-        return CreateCustomer(customer=customer, message="Customer created successfully")
-
-
-# ----------------------------
-# BulkCreateCustomers Mutation
-# ----------------------------
-class BulkCreateCustomers(graphene.Mutation):
-    class Arguments:
-        input = graphene.List(
-            graphene.NonNull(
-                graphene.InputObjectType(
-                    "CustomerInput",
-                    name=graphene.String(required=True),
-                    email=graphene.String(required=True),
-                    phone=graphene.String(),
-                )
-            )
-        )
 
 # ============================
 # GRAPHQL TYPES
@@ -88,18 +27,59 @@ class CustomerType(DjangoObjectType):
     class Meta:
         model = Customer
         fields = "__all__"
+        filter_fields = ['name', 'email']  # 👈 add filterable fields
+        interfaces = (relay.Node,)
+        connection_class = CountableConnection
+
+    orders = OrderConnectionField(lambda: OrderType, filterset_class=OrderFilter)
 
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return plan_queryset(queryset, info)
 
 class ProductType(DjangoObjectType):
     class Meta:
         model = Product
         fields = "__all__"
+        filter_fields = ['name', 'price', 'stock']
+        interfaces = (relay.Node,)
+        connection_class = CountableConnection
 
+    orders = OrderConnectionField(lambda: OrderType, filterset_class=OrderFilter)
+
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return plan_queryset(queryset, info)
 
 class OrderType(DjangoObjectType):
     class Meta:
         model = Order
         fields = "__all__"
+        filter_fields = ['customer__name', 'products__name']
+        interfaces = (relay.Node,)
+        connection_class = CountableConnection
+
+    products = DjangoListField(ProductType)
+
+    # Cursor key for KeysetConnectionField; matches the (order_date, id) index
+    keyset_ordering = ("order_date", "pk")
+
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return plan_queryset(queryset, info)
+
+    # Use what the planner already fetched, otherwise batch through the per-request loaders
+    @bypass_get_queryset
+    def resolve_customer(root, info):
+        if Order.customer.is_cached(root):
+            return root.customer
+        return get_loaders(info).customer.load(root.customer_id)
+
+    def resolve_products(root, info):
+        prefetched = getattr(root, "_prefetched_objects_cache", {})
+        if "products" in prefetched:
+            return list(prefetched["products"])
+        return get_loaders(info).order_products.load(root.pk)
 
 # ============INPUT TYPES================
 class CustomerInput(graphene.InputObjectType):
@@ -108,39 +88,27 @@ class CustomerInput(graphene.InputObjectType):
     phone = graphene.String(required=False)
 
 
-class ProductInput(graphene.InputObjectType):
-    name = graphene.String(required=True)
-    price = graphene.Float(required=True)
-    stock = graphene.Int(required=False, default_value=0)
-
-
-class OrderInput(graphene.InputObjectType):
-    customer_id = graphene.ID(required=True)
-    product_ids = graphene.List(graphene.ID, required=True)
-    order_date = graphene.DateTime(required=False)
-
-
 # ============================
 # MUTATIONS
 # ============================
 class CreateCustomer(graphene.Mutation):
     class Arguments:
         input = CustomerInput(required=True)
+        idempotency_key = graphene.String(required=False)
 
     customer = graphene.Field(CustomerType)
     message = graphene.String()
 
     @staticmethod
+    @idempotent
     def mutate(root, info, input):
         # Validate email uniqueness
         if Customer.objects.filter(email=input.email).exists():
             raise ValidationError("Email already exists")
 
         # Validate phone format if provided
-        if input.phone:
-            pattern = r"^\+?\d{7,15}$|^\d{3}-\d{3}-\d{4}$"
-            if not re.match(pattern, input.phone):
-                raise ValidationError("Invalid phone number format")
+        if input.phone and not PHONE_PATTERN.match(input.phone):
+            raise ValidationError("Invalid phone number format")
 
         # Create customer
         customer = Customer.objects.create(
@@ -155,120 +123,149 @@ class CreateCustomer(graphene.Mutation):
 class BulkCreateCustomers(graphene.Mutation):
     class Arguments:
         input = graphene.List(CustomerInput, required=True)
+        batch_size = graphene.Int(required=False)
+        idempotency_key = graphene.String(required=False)
 
     customers = graphene.List(CustomerType)
     errors = graphene.List(graphene.String)
 
     @staticmethod
-    def mutate(root, info, input):
+    @idempotent
+    def mutate(root, info, input, batch_size=None):
         created_customers = []
         errors = []
-
-        with transaction.atomic():
-            for entry in input:
-                try:
-                    if Customer.objects.filter(email=entry.email).exists():
-                        raise ValidationError(f"Email already exists: {entry.email}")
-
-                    if entry.phone:
-                        pattern = r"^\+?\d{7,15}$|^\d{3}-\d{3}-\d{4}$"
-                        if not re.match(pattern, entry.phone):
-                            raise ValidationError(f"Invalid phone format: {entry.phone}")
-
-                    customer = Customer.objects.create(
-                        name=entry.name,
-                        email=entry.email,
-                        phone=entry.phone or ""
-                    )
-                    created_customers.append(customer)
-
-                except ValidationError as e:
-                    errors.append(str(e))
+        batch_size = batch_size or getattr(settings, "CRM_BULK_CREATE_BATCH_SIZE", 500)
+        if batch_size <= 0:
+            raise ValidationError("Batch size must be positive.")
+
+        # One uniqueness probe for the whole input instead of one exists() per row
+        emails = {entry.email for entry in input}
+        taken = set(Customer.objects.filter(email__in=emails).values_list("email", flat=True))
+
+        pending = []
+        for entry in input:
+            try:
+                if entry.email in taken:
+                    raise ValidationError(f"Email already exists: {entry.email}")
+
+                validate_phone(entry.phone)
+
+                taken.add(entry.email)
+                pending.append(Customer(
+                    name=entry.name,
+                    email=entry.email,
+                    phone=entry.phone or ""
+                ))
+
+            except ValidationError as e:
+                errors.append(str(e))
+
+        # Short transaction per chunk so a large import never holds the write lock for long
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            try:
+                with transaction.atomic():
+                    created_customers.extend(Customer.objects.bulk_create(chunk))
+            except IntegrityError:
+                # A concurrent writer took one of the emails; retry the chunk row by row.
+                for customer in chunk:
+                    try:
+                        with transaction.atomic():
+                            customer.save(force_insert=True)
+                        created_customers.append(customer)
+                    except IntegrityError:
+                        customer.pk = None
+                        errors.append(str(ValidationError(f"Email already exists: {customer.email}")))
+
+        if created_customers:
+            invalidate_caches(Customer)
 
         return BulkCreateCustomers(customers=created_customers, errors=errors)
 
 
 class CreateProduct(graphene.Mutation):
     class Arguments:
-        input = ProductInput(required=True)
+        name = graphene.String(required=True)
+        price = graphene.Float(required=True)
+        stock = graphene.Int(required=False, default_value=0)
 
     product = graphene.Field(ProductType)
-    message = graphene.String()
 
-    @staticmethod
-    def mutate(root, info, input):
-        if input.price <= 0:
-            raise ValidationError("Price must be positive.")
-        if input.stock < 0:
-            raise ValidationError("Stock cannot be negative.")
+    def mutate(self, info, name, price, stock=0):
+        validate_product(price, stock)
 
-        product = Product.objects.create(
-            name=input.name,
-            price=input.price,
-            stock=input.stock
-        )
-        product.save() 
-        return CreateProduct(product=product, message="Product created successfully.")
+        product = Product.objects.create(name=name, price=price, stock=stock)
+        return CreateProduct(product=product)
 
 
 class CreateOrder(graphene.Mutation):
     class Arguments:
-        input = OrderInput(required=True)
+        customer_id = graphene.ID(required=True)
+        product_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        order_date = graphene.DateTime(required=False)
+        # Retries with the same key return the first order instead of placing another
+        idempotency_key = graphene.String(required=False)
 
     order = graphene.Field(OrderType)
-    message = graphene.String()
 
-    @staticmethod
-    def mutate(root, info, input):
+    @idempotent(atomic=False)
+    def mutate(self, info, customer_id, product_ids, order_date=None):
+        # Validate customer
         try:
-            customer = Customer.objects.get(pk=input.customer_id)
+            customer = Customer.objects.get(id=customer_id)
         except Customer.DoesNotExist:
-            raise ValidationError("Customer not found.")
+            raise Exception("Invalid customer ID")
 
-        products = Product.objects.filter(pk__in=input.product_ids)
+        # Validate products
+        products = Product.objects.filter(id__in=product_ids)
         if not products.exists():
-            raise ValidationError("No valid products found.")
-        if len(products) != len(input.product_ids):
-            raise ValidationError("One or more product IDs are invalid.")
+            raise Exception("Invalid product IDs")
+        if len(products) != len(product_ids):
+            raise Exception("One or more product IDs are invalid")
 
-        total_amount = sum([p.price for p in products])
+        # One short transaction that starts with the stock reservation
+        with transaction.atomic():
+            products = reserve_stock(product_ids)
+            order = Order.objects.create(
+                customer=customer,
+                total_amount=sum(p.price for p in products),
+                order_date=order_date or timezone.now()
+            )
+            order.products.set(products)
+            payload = CreateOrder(order=order)
+            # The idempotencyKey's response commits with the order, not in a wider transaction
+            store_response(payload)
+        return payload
 
-        order = Order.objects.create(
-            customer=customer,
-            total_amount=total_amount,
-            order_date=input.order_date or timezone.now()
-        )
-        order.products.set(products)
-        order.save()  # ✅ Save before adding M2M
-        return CreateOrder(order=order, message="Order created successfully.")
 
 # ============================
 # NEW MUTATION: UpdateLowStockProducts
 # ============================
 class UpdateLowStockProducts(graphene.Mutation):
+    class Arguments:
+        threshold = graphene.Int(required=False, default_value=10)
+        increment = graphene.Int(required=False, default_value=10)
+
     success = graphene.Boolean()
     message = graphene.String()
     updated_products = graphene.List(ProductType)
 
     @staticmethod
-    def mutate(root, info):
-        low_stock_products = Product.objects.filter(stock__lt=10)
-        updated = []
+    def mutate(root, info, threshold=10, increment=10):
+        if increment <= 0:
+            raise ValidationError("Increment must be positive.")
 
-        for product in low_stock_products:
-            product.stock += 10
-            product.save()
-            updated.append(product)
+        # Single set-based UPDATE ... SET stock = stock + N per primary-key range
+        updated = restock_low_stock(threshold=threshold, increment=increment)
 
         if updated:
-            msg = f"Updated {len(updated)} low-stock products (+10 each)."
+            msg = f"Updated {len(updated)} low-stock products (+{increment} each)."
         else:
             msg = "No low-stock products found."
 
         return UpdateLowStockProducts(success=True, message=msg, updated_products=updated)
 
 
-
 # ============================
 # ROOT MUTATION
 # ============================
@@ -277,133 +274,71 @@ class Mutation(graphene.ObjectType):
     bulk_create_customers = BulkCreateCustomers.Field()
     create_product = CreateProduct.Field()
     create_order = CreateOrder.Field()
+    update_low_stock_products = UpdateLowStockProducts.Field()
 
-    customers = graphene.List(CustomerType)
-    errors = graphene.List(graphene.String)
 
-    def mutate(self, info, input):
-        customers = []
-        errors = []
-        with transaction.atomic():
-            for data in input:
-                try:
-                    validate_email(data.email)
-                    if Customer.objects.filter(email=data.email).exists():
-                        raise Exception(f"Email '{data.email}' already exists")
-
-                    cust = Customer.objects.create(
-                        name=data.name,
-                        email=data.email,
-                        phone=data.phone or ""
-                    )
-                    customers.append(cust)
-
-                except Exception as e:
-                    errors.append(str(e))
-        return BulkCreateCustomers(customers=customers, errors=errors)
-
-
-# ----------------------------
-# CreateProduct Mutation
-# ----------------------------
-class CreateProduct(graphene.Mutation):
-    class Arguments:
-        name = graphene.String(required=True)
-        price = graphene.Float(required=True)
-        stock = graphene.Int(required=False, default_value=0)
+class CrmStatsType(graphene.ObjectType):
+    customer_count = graphene.Int()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
 
-    product = graphene.Field(ProductType)
 
-    def mutate(self, info, name, price, stock=0):
-        if price <= 0:
-            raise Exception("Price must be positive")
-        if stock < 0:
-            raise Exception("Stock cannot be negative")
-
-        product = Product.objects.create(name=name, price=price, stock=stock)
-        return CreateProduct(product=product)
+class DailySalesType(graphene.ObjectType):
+    date = graphene.Date()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+    customer_count = graphene.Int()
 
 
-# ----------------------------
-# CreateOrder Mutation
-# ----------------------------
-class CreateOrder(graphene.Mutation):
-    class Arguments:
-        customer_id = graphene.ID(required=True)
-        product_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
-        order_date = graphene.DateTime(required=False)
+class Query(graphene.ObjectType):
+    crm_stats = graphene.Field(
+        CrmStatsType,
+        date_from=graphene.DateTime(required=False),
+        date_to=graphene.DateTime(required=False),
+    )
+
+    # Read from the DailySales rollup, one row per day (zeros for days without orders)
+    sales_by_day = graphene.List(
+        DailySalesType,
+        from_=graphene.Date(required=True, name="from"),
+        to=graphene.Date(required=True),
+    )
 
-    order = graphene.Field(OrderType)
+    customers = graphene.List(CustomerType)
+    products = graphene.List(ProductType)
+    orders = graphene.List(OrderType)
 
-    def mutate(self, info, customer_id, product_ids, order_date=None):
-        # Validate customer
-        try:
-            customer = Customer.objects.get(id=customer_id)
-        except Customer.DoesNotExist:
-            raise Exception("Invalid customer ID")
+    customer = relay.Node.Field(CustomerType)
+    all_customers = KeysetConnectionField(CustomerType, filterset_class=CustomerFilter)
 
-        # Validate products
-        products = Product.objects.filter(id__in=product_ids)
-        if not products.exists():
-            raise Exception("Invalid product IDs")
-        if len(products) != len(product_ids):
-            raise Exception("One or more product IDs are invalid")
+    product = relay.Node.Field(ProductType)
+    all_products = KeysetConnectionField(ProductType, filterset_class=ProductFilter)
 
-        total = sum([p.price for p in products])
-        order = Order.objects.create(
-            customer=customer,
-            total_amount=total,
-            order_date=order_date or datetime.now()
-        )
-        order.products.set(products)
-        return CreateOrder(order=order)
+    order = relay.Node.Field(OrderType)
+    all_orders = OrderConnectionField(OrderType, filterset_class=OrderFilter)
 
+    # Ranked full-text search (crm/search.py)
+    search_customers = SearchConnectionField(CustomerType, filterset_class=CustomerFilter)
+    search_products = SearchConnectionField(ProductType, filterset_class=ProductFilter)
 
-# ----------------------------
-# Schema Mutation
-# ----------------------------
-class Mutation(graphene.ObjectType):
-    create_customer = CreateCustomer.Field()
-    bulk_create_customers = BulkCreateCustomers.Field()
-    create_product = CreateProduct.Field()
-    create_order = CreateOrder.Field()
+    def resolve_crm_stats(root, info, date_from=None, date_to=None):
+        return CrmStatsType(**crm_stats(date_from=date_from, date_to=date_to))
 
-class Query(graphene.ObjectType):
-    customers = graphene.List(CustomerType)
-    products = graphene.List(ProductType)
-    orders = graphene.List(OrderType)
+    def resolve_sales_by_day(root, info, from_, to):
+        if (to - from_).days > getattr(settings, "CRM_SALES_BY_DAY_MAX_DAYS", 3660):
+            raise ValidationError("Date range is too long.")
+        return sales_by_day(from_, to)
 
     def resolve_customers(root, info):
-        return Customer.objects.all()
+        return plan_queryset(Customer.objects.all(), info)
 
     def resolve_products(root, info):
-        return Product.objects.all()
+        return plan_queryset(Product.objects.all(), info)
 
     def resolve_orders(root, info):
-        return Order.objects.all()
-class CustomerType(DjangoObjectType):
-    class Meta:
-        model = Customer
-        filter_fields = ['name', 'email']  # 👈 add filterable fields
-        interfaces = (relay.Node,)
+        orders = list(plan_queryset(Order.objects.all(), info))
+        get_loaders(info).prime_orders(orders)
+        return orders
 
-class ProductType(DjangoObjectType):
-    class Meta:
-        model = Product
-        filter_fields = ['name', 'price', 'stock']
-        interfaces = (relay.Node,)
 
-class OrderType(DjangoObjectType):
-    class Meta:
-        model = Order
-        filter_fields = ['customer__name', 'product__name', 'quantity']
-        interfaces = (relay.Node,)
-class Query(graphene.ObjectType):
-    customer = relay.Node.Field(CustomerType)
-    all_customers = DjangoFilterConnectionField(CustomerType)
-
-    product = relay.Node.Field(ProductType)
-    all_products = DjangoFilterConnectionField(ProductType)
-
-    order = relay.Node.Field(OrderType)
-    all_orders = DjangoFilterConnectionField(OrderType)
+schema = graphene.Schema(query=Query, mutation=Mutation)
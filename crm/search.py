@@ -0,0 +1,141 @@
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+import graphene
+
+from .pagination import KeysetConnectionField, keyset_keys
+
+
+# ============================
+# SEARCH INDEXES
+# ============================
+# Columns covered by the search index of each table (see migration 0004_search).
+# SQLite: an external-content FTS5 table "<table>_fts" with the trigram tokenizer,
+# kept in sync by triggers, so bulk_create() and update() are covered too.
+# Note that Django rebuilds SQLite tables for some AlterField operations, which
+# drops the triggers; re-create them in any migration that does that.
+# PostgreSQL: pg_trgm GIN indexes on UPPER(column), which also serve icontains.
+SEARCH_COLUMNS = {
+    "crm_customer": ("name", "email"),
+    "crm_product": ("name",),
+}
+
+# Trigram matching needs at least three characters; shorter terms use icontains
+MIN_TERM_LENGTH = 3
+
+RANK_ANNOTATION = "search_rank"
+
+_fts_tables = {}
+
+
+def fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+def _has_fts(model, using):
+    """True when the FTS5 table for `model` exists on the `using` SQLite database."""
+    key = (using, model._meta.db_table)
+    if key not in _fts_tables:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts_table(model)]
+            )
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def _match_expression(text, fields):
+    # One quoted phrase: a substring match with the trigram tokenizer
+    phrase = '"%s"' % text.replace('"', '""')
+    return "{%s} : %s" % (" ".join(fields), phrase)
+
+
+class FTSRank(Func):
+    """
+    bm25 rank of the outer row in an FTS5 `MATCH`, correlated on the row's pk
+    column as the query compiles it, so table aliases (e.g. in subqueries) work.
+    """
+
+    output_field = FloatField()
+
+    def __init__(self, fts, match):
+        super().__init__(F("pk"))
+        self.fts = fts
+        self.match = match
+
+    def as_sql(self, compiler, connection, **extra_context):
+        pk, params = compiler.compile(self.source_expressions[0])
+        fts = connection.ops.quote_name(self.fts)
+        return f"(SELECT rank FROM {fts} WHERE {fts} MATCH %s AND rowid = {pk})", [self.match, *params]
+
+
+# ============================
+# QUERYSETS
+# ============================
+def search(queryset, text, fields=None, rank=False):
+    """
+    Narrows `queryset` to rows whose `fields` (default: every indexed column)
+    contain `text`, case-insensitively, through the table's search index.
+    With rank=True the rows are annotated with `search_rank` (lower is better).
+    """
+    model = queryset.model
+    table = model._meta.db_table
+    fields = tuple(fields or SEARCH_COLUMNS[table])
+    vendor = connections[queryset.db].vendor
+    text = text.strip()
+
+    if vendor == "sqlite" and len(text) >= MIN_TERM_LENGTH and _has_fts(model, queryset.db):
+        fts = fts_table(model)
+        match = _match_expression(text, fields)
+        queryset = queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match])
+        )
+        if rank:
+            # bm25 of the row, looked up by rowid inside the same MATCH
+            queryset = queryset.annotate(**{RANK_ANNOTATION: FTSRank(fts, match)})
+        return queryset
+
+    queryset = queryset.filter(reduce(or_, (Q(**{f"{field}__icontains": text}) for field in fields)))
+    if rank:
+        if vendor == "postgresql":
+            similarities = [
+                Func(Value(text), F(field), function="WORD_SIMILARITY", output_field=FloatField())
+                for field in fields
+            ]
+            best = similarities[0] if len(similarities) == 1 else Greatest(*similarities)
+            score = best * Value(-1.0)
+        else:
+            score = Value(0.0, output_field=FloatField())
+        queryset = queryset.annotate(**{RANK_ANNOTATION: score})
+    return queryset
+
+
+# ============================
+# GRAPHQL
+# ============================
+_rank_field = FloatField()
+_rank_field.set_attributes_from_name(RANK_ANNOTATION)
+
+
+class SearchConnectionField(KeysetConnectionField):
+    """
+    Filter connection over search(query) results, best match first.
+    Cursors encode (search_rank, pk), so pages stay stable while paging.
+    """
+
+    def __init__(self, type_, *args, **kwargs):
+        kwargs.setdefault("query", graphene.String(required=True))
+        super().__init__(type_, *args, **kwargs)
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        queryset = super().resolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
+        return search(queryset, args["query"], rank=True)
+
+    @classmethod
+    def ordering_keys(cls, connection, queryset):
+        return [(RANK_ANNOTATION, False, _rank_field), *keyset_keys(queryset.model, ("pk",))]
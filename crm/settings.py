@@ -49,6 +49,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'crm.tasks.generate_crm_report',
         'schedule': crontab(day_of_week='mon', hour=6, minute=0),
     },
+    'purge-idempotency-keys': {
+        'task': 'crm.tasks.purge_idempotency_keys',
+        'schedule': crontab(minute=15),
+    },
 }
 # -----------------------------
 # MIDDLEWARE
@@ -68,15 +72,51 @@ MIDDLEWARE = [
 # -----------------------------
 ROOT_URLCONF = 'crm.urls'
 WSGI_APPLICATION = 'crm.wsgi.application'
-
-# -----------------------------
-# DATABASE (SQLite for dev)
-# -----------------------------
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+ASGI_APPLICATION = 'crm.asgi.application'
+
+# Async GraphQL execution; crm/asgi.py turns it on for ASGI servers
+CRM_ASYNC_GRAPHQL = os.environ.get('CRM_ASYNC_GRAPHQL') == '1'
+CRM_ASYNC_ORM_WORKERS = int(os.environ.get('CRM_ASYNC_ORM_WORKERS', 8))  # Threads (and connections) for ORM work
+
+# -----------------------------
+# DATABASE (SQLite for dev, PostgreSQL via CRM_DB_ENGINE)
+# -----------------------------
+# Each value can be set per environment through CRM_DB_* / CRM_SQLITE_* variables.
+if os.environ.get('CRM_DB_ENGINE', 'sqlite') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('CRM_DB_NAME', 'crm'),
+            'USER': os.environ.get('CRM_DB_USER', ''),
+            'PASSWORD': os.environ.get('CRM_DB_PASSWORD', ''),
+            'HOST': os.environ.get('CRM_DB_HOST', ''),
+            'PORT': os.environ.get('CRM_DB_PORT', ''),
+            # Required behind PgBouncer in transaction pooling mode
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('CRM_DB_PGBOUNCER') == '1',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('CRM_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # Seconds a connection waits on a locked database before "database is locked"
+            'OPTIONS': {'timeout': float(os.environ.get('CRM_SQLITE_BUSY_TIMEOUT', 20))},
+        }
     }
+
+# Persistent connections: reused across requests for CONN_MAX_AGE seconds
+# (0 = reconnect on every request). Health checks ping a reused connection
+# before its first query in a request and reconnect if it went away.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('CRM_DB_CONN_MAX_AGE', 60))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('CRM_DB_CONN_HEALTH_CHECKS', '1') == '1'
+
+# Pragmas run on every new SQLite connection (see crm/db.py); '' skips one
+CRM_SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('CRM_SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('CRM_SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': os.environ.get('CRM_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+    'cache_size': os.environ.get('CRM_SQLITE_CACHE_SIZE', '-64000'),  # Negative = KiB
 }
 
 # -----------------------------
@@ -86,6 +126,36 @@ GRAPHENE = {
     "SCHEMA": "crm.schema.schema",  # Path to your GraphQL schema
 }
 
+# Automatic persisted queries (sha256 -> query text) and parsed-document LRU
+CRM_PERSISTED_QUERY_CACHE = 'default'
+CRM_PERSISTED_QUERY_TIMEOUT = None  # Keep persisted queries until evicted
+CRM_DOCUMENT_CACHE_SIZE = 500
+
+# Static query cost analysis (see crm/complexity.py)
+CRM_QUERY_MAX_COST = 10000
+CRM_QUERY_MAX_DEPTH = 8
+CRM_QUERY_DEFAULT_LIST_SIZE = 100  # Page size assumed for lists without first/last
+CRM_QUERY_FIELD_WEIGHTS = {}  # e.g. {"Query.crmStats": 10}
+CRM_SALES_BY_DAY_MAX_DAYS = 3660  # Longest salesByDay(from, to) range
+
+# Resolver timing and SQL metrics, exported at /metrics (see crm/metrics.py)
+CRM_METRICS_SAMPLE_RATE = 0.1  # Share of operations timed per resolver; durations are always recorded
+CRM_METRICS_DEBUG_HEADER = 'X-CRM-Timing'  # Adds extensions.timing (DEBUG or staff users only)
+CRM_METRICS_TOKEN = os.environ.get('CRM_METRICS_TOKEN', '')  # Bearer token for scraping /metrics (staff users need none)
+CRM_METRICS_OPERATIONS = []  # Operation names always used as the `operation` label
+CRM_METRICS_MAX_OPERATIONS = 100  # Persisted-query operation names labelled by name; the rest are "other"
+
+# N+1 detection per GraphQL operation (see crm/query_patterns.py)
+CRM_NPLUSONE_MODE = 'log'  # 'strict' flags every operation (NPlusOneError in tests/CI, extensions.nPlusOne in responses), 'log' logs sampled operations, 'off'
+CRM_NPLUSONE_THRESHOLD = 5  # Runs of the same normalized statement that count as N+1
+CRM_NPLUSONE_SAMPLE_RATE = 0.05  # Share of operations watched in 'log' mode
+
+# Read-through response cache for queries (opt-in). Any CACHES alias works;
+# use a shared backend (Redis) when running several processes.
+CRM_RESPONSE_CACHE_ENABLED = False
+CRM_RESPONSE_CACHE = 'default'
+CRM_RESPONSE_CACHE_TIMEOUT = 60  # Seconds
+
 # -----------------------------
 # STATIC FILES
 # -----------------------------
@@ -105,12 +175,58 @@ TIME_ZONE = 'Africa/Lagos'
 USE_I18N = True
 USE_TZ = True
 
+# -----------------------------
+# CRM BULK OPERATIONS
+# -----------------------------
+CRM_BULK_CREATE_BATCH_SIZE = 500  # Rows per bulk_create / transaction
+CRM_BULK_UPDATE_CHUNK_SIZE = 10000  # Primary-key range per set-based UPDATE
+
+# Cache alias for connection totalCount values, e.g. a Redis entry in CACHES.
+# Only shared backends are used: with a per-process cache (LocMem, the default)
+# writes from Celery, cron or management commands would leave stale counts,
+# so totalCount is computed directly unless this names a shared backend.
+CRM_COUNT_CACHE = None
+CRM_COUNT_CACHE_TIMEOUT = 300  # Seconds
+
+CRM_EXPORT_CHUNK_SIZE = 2000  # Rows fetched (and products prefetched) per export chunk
+CRM_EXPORT_TOKEN = os.environ.get('CRM_EXPORT_TOKEN', '')  # Bearer token for /export/<resource> (staff users need none)
+
+# -----------------------------
+# IDEMPOTENCY KEYS
+# -----------------------------
+CRM_IDEMPOTENCY_TTL = 86400  # Seconds a key's result is replayed to retries
+CRM_IDEMPOTENCY_PENDING_TIMEOUT = 300  # Seconds before a claim with no result (crashed run) can be taken over
+CRM_IDEMPOTENCY_CACHE_SIZE = 10000  # Completed keys kept in each process's in-memory front cache
+
+# -----------------------------
+# ORDER REMINDERS
+# -----------------------------
+CRM_REMINDER_SENDER = 'crm.reminders.FileSender'  # or 'crm.reminders.ConsoleSender'
+CRM_REMINDER_WINDOW_DAYS = 7  # Pending orders placed within this many days
+CRM_REMINDER_PAGE_SIZE = 100  # Orders per keyset page (capped at RELAY_CONNECTION_MAX_LIMIT)
+CRM_REMINDER_WORKERS = 4  # Delivery threads
+CRM_REMINDER_RATE_LIMIT = 20  # Reminders per second across all threads (0 = unlimited)
+
+# -----------------------------
+# LOW-STOCK RESTOCKING
+# -----------------------------
+CRM_LOW_STOCK_THRESHOLD = 10  # Stock below this records a restock event
+CRM_RESTOCK_INCREMENT = 10  # Units added per restock
+CRM_RESTOCK_DEBOUNCE = 30  # Seconds of events folded into one beat-run restock (0 = restock on commit)
+
+if CRM_RESTOCK_DEBOUNCE:
+    CELERY_BEAT_SCHEDULE['restock-low-stock'] = {
+        'task': 'crm.tasks.restock_low_stock_task',
+        'schedule': CRM_RESTOCK_DEBOUNCE,
+    }
+
 # -----------------------------
 # CRON JOBS
 # -----------------------------
 CRONJOBS = [
     ('*/5 * * * *', 'crm.cron.log_crm_heartbeat'),
-    ('0 */12 * * *', 'crm.cron.update_low_stock'),
+    # Safety net only: low-stock events restock products as they run low
+    ('0 3 * * 0', 'crm.cron.update_low_stock'),
 ]
 
 # -----------------------------
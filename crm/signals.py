@@ -0,0 +1,100 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .counting import invalidate_model_counts
+from .low_stock import record_low_stock
+from .models import Customer, DailySales, Order, Product
+from .response_cache import invalidate_responses
+from .rollups import order_day, record_order, refresh_days
+
+
+_pending = threading.local()
+
+
+def on_commit_once(name, items, callback):
+    """
+    Collects `items` under `name` and calls callback(items) with everything
+    collected once the current transaction commits (right away outside one).
+    A write that fires a signal per row thus does the work once per transaction.
+    Items left by a rolled-back transaction are handled with the next commit.
+    """
+    batches = getattr(_pending, "batches", None)
+    if batches is None:
+        batches = _pending.batches = {}
+    batches.setdefault(name, set()).update(items)
+
+    def flush():
+        collected = batches.pop(name, None)
+        if collected:
+            callback(collected)
+
+    # Every call registers a flush: one registered in a savepoint that rolls back is dropped
+    transaction.on_commit(flush, robust=True)
+
+
+def invalidate_caches(*models):
+    """
+    Expires cached counts and responses that read these models once the
+    current transaction commits. Bumping the generations earlier would let a
+    concurrent reader cache pre-commit data under the new generation.
+    post_save/post_delete don't fire for queryset.update() or bulk_create(),
+    so code writing that way calls this directly.
+    """
+    on_commit_once("caches", models, _invalidate_now)
+
+
+def _invalidate_now(models):
+    invalidate_model_counts(*models)
+    invalidate_responses(*models)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Order)
+def invalidate_caches_on_write(sender, **kwargs):
+    invalidate_caches(sender)
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def invalidate_caches_on_order_products(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_caches(sender, Order, Product)
+
+
+# Daily sales rollup (crm/rollups.py)
+@receiver(post_save, sender=Order)
+def record_daily_sales(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # After commit: every order of the day updates the same row, which mustn't stay
+        # locked for the rest of the order's transaction
+        # (robust: a failure is logged, the order stays placed; rebuild_daily_sales repairs the day)
+        transaction.on_commit(lambda: _record_daily_sales(instance), robust=True)
+
+
+def _record_daily_sales(order):
+    record_order(order)
+    invalidate_caches(DailySales)
+
+
+@receiver(post_delete, sender=Order)
+def refresh_daily_sales(sender, instance, **kwargs):
+    # A cascade fires this once per order; each day is recomputed once, after the commit
+    on_commit_once("daily_sales", [order_day(instance)], _refresh_daily_sales)
+
+
+def _refresh_daily_sales(days):
+    refresh_days(days)
+    invalidate_caches(DailySales)
+
+
+# Low-stock events (crm/low_stock.py)
+@receiver(post_save, sender=Product)
+def record_low_stock_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_low_stock([instance])
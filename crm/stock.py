@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.db.models import F, Max, Min
+
+from .low_stock import record_low_stock
+from .models import Product
+from .signals import invalidate_caches
+
+
+def restock_low_stock(threshold=10, increment=10, chunk_size=None, product_ids=None):
+    """
+    Adds `increment` to every product with stock below `threshold`
+    using `stock = stock + N`, one UPDATE per primary-key range.
+    Returns the updated products.
+    """
+    chunk_size = chunk_size or getattr(settings, "CRM_BULK_UPDATE_CHUNK_SIZE", 10000)
+    low_stock = Product.objects.filter(stock__lt=threshold)
+    if product_ids is not None:
+        low_stock = low_stock.filter(pk__in=product_ids)
+
+    bounds = low_stock.aggregate(lo=Min("pk"), hi=Max("pk"))
+    if bounds["lo"] is None:
+        return []
+
+    updated = []
+    for start in range(bounds["lo"], bounds["hi"] + 1, chunk_size):
+        chunk = low_stock.filter(pk__gte=start, pk__lt=start + chunk_size)
+        while True:
+            with transaction.atomic():
+                # Locks the chunk's low-stock rows on PostgreSQL; the UPDATE re-checks the
+                # threshold for backends where select_for_update() is a no-op (SQLite)
+                ids = list(chunk.select_for_update().values_list("pk", flat=True))
+                matched = Product.objects.filter(pk__in=ids, stock__lt=threshold).update(stock=F("stock") + increment)
+                if matched == len(ids):
+                    updated.extend(Product.objects.filter(pk__in=ids))
+                    break
+                # Some rows were restocked in between: undo the chunk and select it again,
+                # so only the rows this UPDATE actually changed are returned
+                transaction.set_rollback(True)
+
+    # update() skips post_save, which expires cached counts and responses
+    if updated:
+        invalidate_caches(Product)
+    return updated
+
+
+def reserve_stock(product_ids):
+    """
+    Takes one unit of each product, all or nothing, with a conditional
+    `stock = stock - 1 WHERE stock >= 1` UPDATE; call it first thing inside
+    the order's transaction.atomic(). Returns the reserved products with their
+    new stock, or raises ValidationError when any of them is sold out.
+
+    Concurrent orders only wait on each other for the products they share,
+    and only until the other transaction ends. On PostgreSQL the rows are
+    locked in id order first, so orders with overlapping products can't
+    deadlock. On SQLite, making the UPDATE the transaction's first statement
+    takes the write lock up front instead of upgrading a read lock.
+    """
+    ids = sorted({Product._meta.pk.to_python(pk) for pk in product_ids})
+    available = Product.objects.filter(pk__in=ids, stock__gte=1)
+
+    # A savepoint of its own, so a sold-out product undoes the other decrements
+    with transaction.atomic(using=available.db):
+        if connections[available.db].vendor == "postgresql":
+            list(Product.objects.filter(pk__in=ids).order_by("pk").select_for_update().values_list("pk", flat=True))
+
+        updated = available.update(stock=F("stock") - 1)
+        if updated == len(ids):
+            reserved = list(Product.objects.filter(pk__in=ids))
+            # update() skips the post_save receiver that tracks low stock
+            record_low_stock(reserved)
+        else:
+            transaction.set_rollback(True, using=available.db)
+
+    if updated != len(ids):
+        sold_out = set(ids) - set(available.values_list("pk", flat=True)) or set(ids)
+        raise ValidationError(f"Insufficient stock for product IDs: {', '.join(map(str, sorted(sold_out)))}")
+
+    # ... and the one that expires cached counts and responses (deferred until the order commits)
+    invalidate_caches(Product)
+    return reserved
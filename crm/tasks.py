@@ -1,44 +1,33 @@
 from celery import shared_task
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
 from datetime import datetime
 import logging
-import requests
 
-@shared_task
-def generate_crm_report():
-    # GraphQL setup
-    transport = RequestsHTTPTransport(
-        url='http://localhost:8000/graphql',
-        verify=False,
-        retries=3,
-    )
-    client = Client(transport=transport, fetch_schema_from_transport=True)
-
-    # GraphQL query
-    query = gql("""
-    query {
-        allCustomers {
-            totalCount
-        }
-        allOrders {
-            totalCount
-        }
-        orders {
-            totalAmount
-        }
+from .executor import Operation
+from .idempotency import purge_expired_keys
+from .low_stock import drain_restock_requests
+from .reminders import send_order_reminders
+
+# Executed in the worker process (totals are aggregated by the database, not summed here)
+CRM_REPORT = Operation("""
+query {
+    crmStats {
+        customerCount
+        orderCount
+        revenue
     }
-    """)
+}
+""")
 
-    try:
-        result = client.execute(query)
 
-        total_customers = result.get('allCustomers', {}).get('totalCount', 0)
-        total_orders = result.get('allOrders', {}).get('totalCount', 0)
+@shared_task
+def generate_crm_report():
+    try:
+        result = CRM_REPORT.execute()
 
-        # Calculate total revenue
-        orders = result.get('orders', [])
-        total_revenue = sum([o.get('totalAmount', 0) for o in orders])
+        stats = result.get('crmStats') or {}
+        total_customers = stats.get('customerCount', 0)
+        total_orders = stats.get('orderCount', 0)
+        total_revenue = stats.get('revenue', 0)
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_message = f"{timestamp} - Report: {total_customers} customers, {total_orders} orders, ₦{total_revenue} revenue\n"
@@ -51,3 +40,24 @@ def generate_crm_report():
 
     except Exception as e:
         logging.error(f"CRM Report generation failed: {str(e)}")
+
+
+@shared_task
+def send_order_reminders_task():
+    stats = send_order_reminders()
+    logging.info(
+        f"Order reminders: {stats.sent} sent, {stats.failed} failed, {stats.duplicates} folded "
+        f"from {stats.orders} orders ({stats.reminders_per_second:.1f}/s)"
+    )
+
+
+@shared_task
+def restock_low_stock_task():
+    # Run by beat every CRM_RESTOCK_DEBOUNCE seconds (crm/low_stock.py)
+    updated = drain_restock_requests()
+    logging.info(f"Restocked {len(updated)} low-stock products")
+
+
+@shared_task
+def purge_idempotency_keys():
+    logging.info(f"Purged {purge_expired_keys()} expired idempotency keys")
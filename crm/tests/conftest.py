@@ -0,0 +1,55 @@
+import os
+import sys
+
+# The repository root is also the project package (settings.py, celery.py, ...),
+# so on sys.path its celery.py would shadow the celery library. Keep it last:
+# `crm` still resolves from here, `celery` from site-packages.
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path[:] = [path for path in sys.path if os.path.abspath(path or os.curdir) != ROOT] + [ROOT]
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "crm.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    """
+    A file for the SQLite test database: threads sharing an in-memory one fail with
+    "database table is locked" instead of waiting out the busy timeout like in production.
+    """
+    from django.conf import settings
+
+    test = settings.DATABASES["default"].setdefault("TEST", {})
+    if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3") and not test.get("NAME"):
+        test["NAME"] = str(tmp_path_factory.mktemp("db") / "test.sqlite3")
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Counts, generations and persisted queries must not leak from one test's database into the next."""
+    from django.core.cache import caches
+
+    for cache in caches.all():
+        cache.clear()
+    yield
+
+
+@pytest.fixture
+def orders(db):
+    """Three customers with two orders each; every order holds two of four products."""
+    from crm.models import Customer, Order, Product
+
+    customers = [Customer.objects.create(name=f"Customer {i}", email=f"customer{i}@example.com") for i in range(3)]
+    products = [Product.objects.create(name=f"Product {i}", price=10 + i, stock=100) for i in range(4)]
+    created = []
+    for i, customer in enumerate(customers * 2):
+        order = Order.objects.create(customer=customer, total_amount=0)
+        order.products.set(products[i % 3:i % 3 + 2])
+        created.append(order)
+    return created
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from django.test import RequestFactory
+
+from crm.models import Product
+from crm.response_cache import ResponseCache
+from crm.views import AsyncCRMGraphQLView
+
+QUERY = "{ a: allProducts(first: 5) { edges { node { name } } } b: allCustomers(first: 5) { totalCount } }"
+
+
+def post(body):
+    request = RequestFactory().post("/graphql", json.dumps(body), content_type="application/json")
+    response = asyncio.run(AsyncCRMGraphQLView.as_view()(request))
+    return response.status_code, json.loads(response.content)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_queries_execute_on_the_orm_pool():
+    Product.objects.create(name="Pen", price=1, stock=3)
+    status, body = post({"query": QUERY})
+    assert status == 200
+    assert body["data"] == {"a": {"edges": [{"node": {"name": "Pen"}}]}, "b": {"totalCount": 0}}
+    assert "cost" in body["extensions"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cache_calls_stay_off_the_event_loop(settings, monkeypatch):
+    settings.CRM_RESPONSE_CACHE_ENABLED = True
+    threads = []
+    for name in ("get", "generations", "set"):
+        original = getattr(ResponseCache, name)
+
+        def record(self, *args, _original=original, **kwargs):
+            threads.append(threading.current_thread().name)
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(ResponseCache, name, record)
+
+    assert post({"query": QUERY})[1]["extensions"]["cache"] == "MISS"
+    assert post({"query": QUERY})[1]["extensions"]["cache"] == "HIT"
+    # Miss: get, generations, set. Hit: get and the generations check inside it
+    assert len(threads) == 5
+    assert all(name.startswith("crm-orm") for name in threads)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_mutations_and_http_errors():
+    status, body = post({"query": 'mutation { createProduct(name: "Pen", price: 1, stock: 3) { product { name } } }'})
+    assert body["data"] == {"createProduct": {"product": {"name": "Pen"}}}
+
+    request = RequestFactory().get("/graphql", {"query": "mutation { __typename }"})
+    assert asyncio.run(AsyncCRMGraphQLView.as_view()(request)).status_code == 405
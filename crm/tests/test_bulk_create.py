@@ -0,0 +1,59 @@
+from crm.models import Customer
+from crm.schema import schema
+
+BULK_CREATE = """
+mutation Bulk($input: [CustomerInput]!, $batchSize: Int) {
+  bulkCreateCustomers(input: $input, batchSize: $batchSize) {
+    customers { email }
+    errors
+  }
+}
+"""
+
+COUNT = "{ allCustomers(first: 1) { totalCount } }"
+
+
+def customer(i, **extra):
+    return {"name": f"Bulk {i}", "email": f"bulk{i}@example.com", **extra}
+
+
+def bulk_create(rows, batch_size=None):
+    result = schema.execute(BULK_CREATE, variable_values={"input": rows, "batchSize": batch_size})
+    assert not result.errors, result.errors
+    return result.data["bulkCreateCustomers"]
+
+
+def test_creates_rows_in_batches(db, django_assert_max_num_queries):
+    # One uniqueness probe, then BEGIN/INSERT/COMMIT per batch of 2
+    with django_assert_max_num_queries(1 + 3 * 3):
+        payload = bulk_create([customer(i) for i in range(5)], batch_size=2)
+    assert [c["email"] for c in payload["customers"]] == [f"bulk{i}@example.com" for i in range(5)]
+    assert payload["errors"] == []
+    assert Customer.objects.count() == 5
+
+
+def test_rejects_duplicates_and_invalid_phones(db):
+    Customer.objects.create(name="Taken", email="bulk0@example.com")
+    payload = bulk_create([
+        customer(0),
+        customer(1),
+        customer(1),
+        customer(2, phone="not a phone"),
+        customer(3, phone="+1234567890"),
+    ])
+    assert [c["email"] for c in payload["customers"]] == ["bulk1@example.com", "bulk3@example.com"]
+    assert len(payload["errors"]) == 3
+    assert Customer.objects.count() == 3
+
+
+def test_rejects_negative_batch_size(db):
+    result = schema.execute(BULK_CREATE, variable_values={"input": [customer(0)], "batchSize": -1})
+    assert result.errors[0].message == "Batch size must be positive."
+    assert not Customer.objects.exists()
+
+
+def test_expires_cached_counts(db, django_capture_on_commit_callbacks):
+    assert schema.execute(COUNT).data["allCustomers"]["totalCount"] == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        bulk_create([customer(i) for i in range(3)])
+    assert schema.execute(COUNT).data["allCustomers"]["totalCount"] == 3
@@ -0,0 +1,52 @@
+import pytest
+from graphql import parse
+
+from crm.complexity import CostAnalyzer, QueryTooExpensive, check_query_cost
+from crm.schema import schema
+
+CUSTOMERS = "{ allCustomers(first: 5) { edges { node { name } } } }"
+CUSTOMER_ORDERS = """
+    query CustomerOrders($first: Int) {
+      allCustomers(first: $first) { edges { node { ...Orders } } }
+    }
+    fragment Orders on CustomerType { orders(first: 2) { edges { node { id } } } }
+"""
+
+
+def analyze(query, variables=None, **kwargs):
+    return CostAnalyzer(schema.graphql_schema, parse(query), variables, **kwargs).analyze()
+
+
+def test_page_size_multiplies_only_the_edges():
+    # allCustomers 1 + edges (1 + 5 nodes x 1)
+    assert analyze(CUSTOMERS) == (7, 1)
+
+
+def test_nested_connections_through_fragments_and_variables():
+    # Each of the 5 customer nodes costs 1 + orders (1 + edges (1 + 2 x 1))
+    assert analyze(CUSTOMER_ORDERS, {"first": 5}) == (27, 2)
+
+
+def test_unbounded_connections_use_the_default_list_size():
+    assert analyze("{ allCustomers { edges { node { name } } } }", default_list_size=10) == (12, 1)
+
+
+def test_field_weights():
+    assert analyze(CUSTOMERS, weights={"CustomerType.name": 4}) == (27, 1)
+
+
+def test_check_query_cost_reports_and_enforces_limits(settings):
+    document = parse(CUSTOMERS)
+    assert check_query_cost(schema.graphql_schema, document) == {
+        "cost": 7, "maxCost": settings.CRM_QUERY_MAX_COST, "depth": 1, "maxDepth": settings.CRM_QUERY_MAX_DEPTH,
+    }
+
+    settings.CRM_QUERY_MAX_COST = 6
+    with pytest.raises(QueryTooExpensive) as error:
+        check_query_cost(schema.graphql_schema, document)
+    assert error.value.extensions["code"] == "QUERY_TOO_EXPENSIVE"
+
+    settings.CRM_QUERY_MAX_DEPTH = 1
+    with pytest.raises(QueryTooExpensive) as error:
+        check_query_cost(schema.graphql_schema, parse(CUSTOMER_ORDERS), variables={"first": 1})
+    assert error.value.extensions["code"] == "QUERY_TOO_DEEP"
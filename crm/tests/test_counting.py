@@ -0,0 +1,67 @@
+from unittest import mock
+
+import pytest
+
+from crm import signals
+from crm.counting import count_queryset
+from crm.models import Customer, Product
+from crm.schema import schema
+
+COUNT = "{ allCustomers(first: 1) { totalCount } }"
+
+
+def total_count(query=COUNT):
+    result = schema.execute(query)
+    assert not result.errors, result.errors
+    return result.data["allCustomers"]["totalCount"]
+
+
+@pytest.fixture
+def count_cache(settings, tmp_path):
+    # Any backend shared between processes; LocMem and dummy caches are ignored
+    settings.CACHES = {
+        **settings.CACHES,
+        "counts": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(tmp_path)},
+    }
+    settings.CRM_COUNT_CACHE = "counts"
+
+
+def test_counts_are_not_cached_per_process(orders, settings, django_assert_num_queries):
+    settings.CRM_COUNT_CACHE = "default"
+    count_queryset(Customer.objects.all())
+    with django_assert_num_queries(1):
+        assert count_queryset(Customer.objects.all()) == 3
+
+
+def test_counts_are_cached(orders, count_cache, django_assert_num_queries):
+    queryset = Customer.objects.filter(name__startswith="Customer")
+    assert count_queryset(queryset) == 3
+    with django_assert_num_queries(0):
+        assert count_queryset(queryset) == 3
+    assert count_queryset(Customer.objects.filter(name="Customer 1")) == 1
+
+
+def test_estimated_count_falls_back_to_exact(orders):
+    # No ANALYZE statistics on the test database
+    assert count_queryset(Product.objects.all(), estimated=True) == 4
+    result = schema.execute("{ allProducts(first: 1) { totalCount(estimated: true) } }")
+    assert result.data["allProducts"]["totalCount"] == 4
+
+
+def test_writes_expire_counts_after_commit(orders, count_cache, django_capture_on_commit_callbacks):
+    assert total_count() == 3
+    with django_capture_on_commit_callbacks(execute=True):
+        Customer.objects.create(name="New", email="new@example.com")
+        # Not committed yet: a reader mustn't cache this state under a new generation
+        assert total_count() == 3
+    assert total_count() == 4
+
+
+def test_one_invalidation_per_transaction(db, django_capture_on_commit_callbacks):
+    with mock.patch.object(signals, "invalidate_model_counts") as invalidate:
+        with django_capture_on_commit_callbacks(execute=True):
+            for i in range(10):
+                Customer.objects.create(name=f"Row {i}", email=f"row{i}@example.com")
+            Product.objects.create(name="Widget", price=1, stock=100)
+    invalidate.assert_called_once()
+    assert set(invalidate.call_args.args) == {Customer, Product}
@@ -0,0 +1,41 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from crm.db import sqlite_pragmas
+
+
+def open_sqlite(path):
+    connection = DatabaseWrapper({
+        "NAME": str(path), "OPTIONS": {}, "TIME_ZONE": None, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False,
+        "AUTOCOMMIT": True, "ATOMIC_REQUESTS": False,
+    })
+    connection.ensure_connection()
+    return connection
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_new_connections_get_the_pragmas(tmp_path, settings):
+    settings.CRM_SQLITE_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL", "mmap_size": "", "cache_size": -4000}
+    connection = open_sqlite(tmp_path / "crm.sqlite3")
+    try:
+        assert pragma(connection, "journal_mode") == "wal"
+        assert pragma(connection, "synchronous") == 1  # NORMAL
+        assert pragma(connection, "cache_size") == -4000
+    finally:
+        connection.close()
+
+
+def test_pragmas_are_validated(settings):
+    settings.CRM_SQLITE_PRAGMAS = {"journal_mode": "WAL", "mmap_size": None}
+    assert sqlite_pragmas() == [("journal_mode", "WAL", "PRAGMA journal_mode = WAL")]
+
+    settings.CRM_SQLITE_PRAGMAS = {"journal_mode": "WAL; DROP TABLE crm_customer"}
+    with pytest.raises(ImproperlyConfigured):
+        sqlite_pragmas()
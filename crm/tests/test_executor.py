@@ -0,0 +1,60 @@
+import pytest
+from django.db import DatabaseError, connection
+
+from crm.cron import UPDATE_LOW_STOCK
+from crm.executor import Operation, OperationError, execute_operation
+from crm.models import Product
+
+
+@pytest.mark.django_db
+def test_execute_returns_data():
+    Product.objects.create(name="Pen", price=1, stock=3)
+    data = execute_operation("query Products($first: Int) { allProducts(first: $first) { edges { node { name } } } }", {"first": 1})
+    assert data == {"allProducts": {"edges": [{"node": {"name": "Pen"}}]}}
+
+
+def test_invalid_operation_raises():
+    with pytest.raises(OperationError, match="noSuchField"):
+        Operation("{ noSuchField }").execute()
+
+
+TWO_PRODUCTS = Operation("""
+    mutation {
+      ok: createProduct(name: "Pen", price: 1, stock: 3) { product { id } }
+      bad: createProduct(name: "Ink", price: -1, stock: 3) { product { id } }
+    }
+""")
+
+
+@pytest.mark.django_db
+def test_atomic_mutation_rolls_back_every_field():
+    with pytest.raises(OperationError):
+        TWO_PRODUCTS.execute(atomic=True)
+    assert not Product.objects.exists()
+
+
+@pytest.mark.django_db
+def test_mutation_keeps_its_own_commits_by_default():
+    with pytest.raises(OperationError):
+        TWO_PRODUCTS.execute()
+    assert list(Product.objects.values_list("name", flat=True)) == ["Pen"]
+
+
+@pytest.mark.django_db
+def test_restock_chunks_commit_independently(settings):
+    settings.CRM_BULK_UPDATE_CHUNK_SIZE = 2
+    for i in range(4):
+        Product.objects.create(name=f"P{i}", price=1, stock=0)
+    updates = []
+
+    def fail_second_chunk(execute, sql, params, many, context):
+        if sql.startswith("UPDATE"):
+            updates.append(sql)
+            if len(updates) == 2:
+                raise DatabaseError("connection lost")
+        return execute(sql, params, many, context)
+
+    with pytest.raises(OperationError), connection.execute_wrapper(fail_second_chunk):
+        UPDATE_LOW_STOCK.execute()
+    # The first chunk's transaction committed before the second one failed
+    assert [p.stock for p in Product.objects.order_by("pk")] == [10, 10, 0, 0]
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import User
+
+from crm.exports import export_rows
+from crm.models import Order
+
+
+@pytest.fixture
+def staff_client(client, db):
+    client.force_login(User.objects.create_user("ops", is_staff=True))
+    return client
+
+
+def content(response):
+    return b"".join(response.streaming_content).decode()
+
+
+def test_order_rows_batch_the_products(orders, django_assert_num_queries):
+    # One query for the orders (chunk_size 4 -> 2 chunks) plus one per chunk for their products
+    with django_assert_num_queries(3):
+        rows = list(export_rows("orders", Order.objects.all(), chunk_size=4))
+
+    assert [row["id"] for row in rows] == [order.pk for order in orders]
+    for row, order in zip(rows, orders):
+        assert row["customer_email"] == order.customer.email
+        assert row["product_ids"] == sorted(order.products.values_list("pk", flat=True))
+
+
+def test_ndjson_export(staff_client, orders):
+    response = staff_client.get("/export/orders", {"customer_name": "Customer 1"})
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in content(response).splitlines()]
+    assert [row["id"] for row in rows] == [orders[1].pk, orders[4].pk]
+
+
+def test_csv_export(staff_client, orders):
+    response = staff_client.get("/export/customers", {"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(content(response))))
+    assert [row["email"] for row in rows] == [f"customer{i}@example.com" for i in range(3)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("path, status", [
+    ("/export/invoices", 404),
+    ("/export/orders?format=xml", 400),
+    ("/export/orders?total_amount__gte=abc", 400),
+])
+def test_bad_requests(staff_client, path, status):
+    assert staff_client.get(path).status_code == status
+
+
+def test_export_requires_staff_or_the_token(client, orders, settings):
+    settings.CRM_EXPORT_TOKEN = "s3cret"
+    response = client.get("/export/customers")
+    assert response.status_code == 401
+    assert response["WWW-Authenticate"] == 'Bearer realm="export"'
+    assert client.get("/export/customers", HTTP_AUTHORIZATION="Bearer wrong").status_code == 401
+    assert client.get("/export/customers", HTTP_AUTHORIZATION="Bearer s3cret").status_code == 200
+
+    client.force_login(User.objects.create_user("clerk"))
+    assert client.get("/export/customers").status_code == 401
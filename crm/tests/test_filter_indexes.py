@@ -0,0 +1,22 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+from crm.models import Order
+
+
+@pytest.mark.django_db(transaction=True)
+def test_filters_use_their_indexes():
+    # The benchmark reconnects between runs, which a test transaction would not survive
+    out = io.StringIO()
+    call_command("bench_filter_indexes", seed=True, rows=50, batch_size=20, repeat=1, stdout=out)
+
+    assert Order.objects.count() == 50
+    assert Order.objects.values("order_date").distinct().count() > 1
+    rows = out.getvalue().splitlines()[4:]
+    assert len(rows) == 6
+    for row in rows:
+        # filter, without index (path, time), with index (path, time)
+        assert row.split("ms")[0].split()[-2] == "scan", row
+        assert row.split("ms")[1].split()[0] == "index", row
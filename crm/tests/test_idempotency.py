@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from crm.idempotency import replays
+from crm.models import Customer, IdempotencyKey, Order, Product
+from crm.schema import schema
+
+CREATE_CUSTOMER = """
+mutation Create($email: String!, $key: String) {
+  createCustomer(input: {name: "Ada", email: $email}, idempotencyKey: $key) { customer { id email } }
+}
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_replays():
+    replays.clear()
+    yield
+    replays.clear()
+
+
+def create(email, key="order-1"):
+    return schema.execute(CREATE_CUSTOMER, variable_values={"email": email, "key": key}, context_value=SimpleNamespace())
+
+
+@pytest.mark.django_db
+def test_retry_replays_the_first_response(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        first = create("ada@example.com")
+    replays.clear()  # Served from the table, like in another process
+    second = create("ada@example.com")
+
+    assert first.errors is None and second.errors is None
+    assert second.data == first.data
+    assert Customer.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_key_reused_with_other_arguments():
+    create("ada@example.com")
+    result = create("bob@example.com")
+    assert "different arguments" in result.errors[0].message
+
+
+@pytest.mark.django_db
+def test_failure_storing_the_response_rolls_the_write_back():
+    with mock.patch("crm.idempotency.dump_payload", side_effect=RuntimeError("crash")):
+        result = create("ada@example.com")
+
+    assert result.errors[0].message == "crash"
+    assert not Customer.objects.exists()
+    # The key is free again, so the client's retry runs the mutation
+    assert not IdempotencyKey.objects.exists()
+    assert create("ada@example.com").errors is None
+    assert Customer.objects.count() == 1
+
+
+CREATE_ORDER = """
+mutation Order($customer: ID!, $products: [ID!]!, $key: String) {
+  createOrder(customerId: $customer, productIds: $products, idempotencyKey: $key) { order { id } }
+}
+"""
+
+
+def order(customer, product, key="order-1"):
+    variables = {"customer": customer.pk, "products": [product.pk], "key": key}
+    return schema.execute(CREATE_ORDER, variable_values=variables, context_value=SimpleNamespace())
+
+
+@pytest.fixture
+def shop(db):
+    customer = Customer.objects.create(name="Ada", email="ada@example.com")
+    return customer, Product.objects.create(name="Pen", price=1, stock=5)
+
+
+def test_order_retry_places_one_order(shop, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        first = order(*shop)
+    second = order(*shop)
+
+    assert first.errors is None and second.data == first.data
+    assert Order.objects.count() == 1
+    assert Product.objects.get().stock == 4
+
+
+def test_order_response_is_stored_inside_the_reservation(shop):
+    with mock.patch("crm.idempotency.dump_payload", side_effect=RuntimeError("crash")):
+        assert order(*shop).errors[0].message == "crash"
+
+    # The order and its stock reservation rolled back with the response
+    assert not Order.objects.exists()
+    assert Product.objects.get().stock == 5
+    assert not IdempotencyKey.objects.exists()
@@ -0,0 +1,70 @@
+import io
+import json
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+
+from crm.importer import Importer
+from crm.models import Customer, DailySales, Order, Product
+
+
+def write(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+@pytest.mark.django_db
+def test_import_validates_rows_and_resolves_references(tmp_path):
+    rejected = []
+    importer = Importer(batch_size=2, on_reject=lambda label, line, row, message: rejected.append((label, line, message)))
+    customers, products = importer.run(
+        customers=write(tmp_path / "customers.ndjson", [
+            {"name": "Ada", "email": "ada@example.com", "phone": "+15551234567"},
+            {"name": "Bob", "email": "bob@example.com"},
+            {"name": "Ada again", "email": "ada@example.com"},
+            {"name": "Eve", "email": "not-an-email"},
+        ]),
+        products=write(tmp_path / "products.ndjson", [
+            {"name": "Pen", "price": "1.50", "stock": 10},
+            {"name": "Ink", "price": "-1", "stock": 10},
+        ]),
+    )
+    pen = Product.objects.get()
+    orders, = importer.run(orders=write(tmp_path / "orders.ndjson", [
+        {"customer_email": "ada@example.com", "product_ids": [pen.pk], "order_date": "2024-01-02T10:00:00"},
+        {"customer_email": "nobody@example.com", "product_ids": [pen.pk]},
+        {"customer_email": "bob@example.com", "product_ids": [pen.pk + 1]},
+    ]))
+
+    assert (customers.imported, customers.rejected) == (2, 2)
+    assert (products.imported, products.rejected) == (1, 1)
+    assert (orders.imported, orders.rejected) == (1, 2)
+    assert [(label, line) for label, line, _ in rejected] == [
+        ("customers", 3), ("customers", 4), ("products", 2), ("orders", 2), ("orders", 3),
+    ]
+
+    order = Order.objects.get()
+    assert order.customer == Customer.objects.get(email="ada@example.com")
+    assert list(order.products.all()) == [pen]
+    assert order.total_amount == pen.price
+    assert order.order_date.year == 2024
+    # bulk_create skips the rollup signals; the importer refreshes the days itself
+    assert DailySales.objects.get().order_count == 1
+
+
+@pytest.mark.django_db
+def test_import_orders_by_customer_id_from_csv(tmp_path):
+    customer = Customer.objects.create(name="Ada", email="ada@example.com")
+    products = [Product.objects.create(name=name, price=2, stock=5) for name in ("Pen", "Ink")]
+    path = tmp_path / "orders.csv"
+    path.write_text(f"customer_id,product_ids\n{customer.pk},{products[0].pk};{products[1].pk}\n")
+
+    with mock.patch("crm.importer.invalidate_caches") as invalidate:
+        call_command("crm_import", orders=str(path), stdout=io.StringIO())
+    # bulk_create sends no signals, for the through rows either
+    invalidate.assert_called_once_with(Order, Order.products.through, DailySales)
+
+    order = Order.objects.get()
+    assert sorted(order.products.values_list("pk", flat=True)) == [product.pk for product in products]
+    assert order.total_amount == 4
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pytest
+
+from crm.loaders import DataLoader, Loaders
+from crm.models import Order
+from crm.schema import schema
+
+
+def test_data_loader_fetches_primed_keys_in_one_batch():
+    calls = []
+
+    def load(keys):
+        calls.append(list(keys))
+        return [key * 2 for key in keys]
+
+    loader = DataLoader(load)
+    loader.prime([1, 2, 3])
+    assert [loader.load(key) for key in (1, 2, 3)] == [2, 4, 6]
+    assert calls == [[1, 2, 3]]
+
+    assert loader.load(4) == 8
+    assert calls == [[1, 2, 3], [4]]
+
+
+def test_loaders_batch_customers_and_products(orders, django_assert_num_queries):
+    orders = list(Order.objects.all())
+    loaders = Loaders()
+    loaders.prime_orders(orders)
+
+    with django_assert_num_queries(2):
+        customers = [loaders.customer.load(order.customer_id) for order in orders]
+        products = [loaders.order_products.load(order.pk) for order in orders]
+
+    assert [customer.pk for customer in customers] == [order.customer_id for order in orders]
+    assert [sorted(p.pk for p in group) for group in products] == [
+        sorted(order.products.values_list("pk", flat=True)) for order in orders
+    ]
+
+
+@pytest.mark.parametrize("query", [
+    "{ orders { customer { name } products { name } } }",
+    "{ allOrders(first: 10) { edges { node { customer { name } products { name } } } } }",
+])
+def test_order_relations_do_not_query_per_order(orders, query, django_assert_max_num_queries):
+    # One query per list/relation, however many orders there are; the loaders
+    # live on the context, which the view sets to the request
+    with django_assert_max_num_queries(4):
+        result = schema.execute(query, context_value=SimpleNamespace())
+    assert not result.errors
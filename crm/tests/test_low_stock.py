@@ -0,0 +1,36 @@
+from django.conf import settings as project_settings
+
+from crm.low_stock import drain_restock_requests
+from crm.models import Product, RestockRequest
+from crm.tasks import restock_low_stock_task
+
+
+def test_low_stock_writes_an_event_for_beat(db, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        pen = Product.objects.create(name="Pen", price=1, stock=2)
+        Product.objects.create(name="Ink", price=1, stock=50)
+
+    # Nothing is sent to the broker on commit; beat drains the table
+    assert not [callback for callback in callbacks if callback.__name__ == "drain_restock_requests"]
+    assert list(RestockRequest.objects.values_list("product_id", flat=True)) == [pen.pk]
+    assert project_settings.CELERY_BEAT_SCHEDULE["restock-low-stock"]["schedule"] == project_settings.CRM_RESTOCK_DEBOUNCE
+
+    restock_low_stock_task()
+    pen.refresh_from_db()
+    assert pen.stock == 2 + project_settings.CRM_RESTOCK_INCREMENT
+    assert not RestockRequest.objects.exists()
+
+
+def test_requests_for_restocked_products_are_dropped(db):
+    pen = Product.objects.create(name="Pen", price=1, stock=2)
+    Product.objects.filter(pk=pen.pk).update(stock=40)
+    assert drain_restock_requests() == []
+    assert not RestockRequest.objects.exists()
+
+
+def test_without_a_window_restock_happens_on_commit(db, settings, django_capture_on_commit_callbacks):
+    settings.CRM_RESTOCK_DEBOUNCE = 0
+    with django_capture_on_commit_callbacks(execute=True):
+        pen = Product.objects.create(name="Pen", price=1, stock=2)
+    pen.refresh_from_db()
+    assert pen.stock == 2 + settings.CRM_RESTOCK_INCREMENT
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from graphql import parse
+
+from crm import metrics
+from crm.metrics import operation_label
+from crm.models import Product
+from crm.persisted import query_hash
+
+QUERY = "query Products { allProducts(first: 1) { edges { node { name } } } }"
+
+
+def label(query, persisted=False, operation_name=None):
+    return operation_label(parse(query).definitions[0], operation_name, persisted)
+
+
+def test_only_known_operation_names_become_labels(settings, monkeypatch):
+    monkeypatch.setattr(metrics, "_persisted_names", set())
+    settings.CRM_METRICS_OPERATIONS = ["Listed"]
+    settings.CRM_METRICS_MAX_OPERATIONS = 2
+
+    assert label("query Listed { __typename }") == ("Listed", "query")
+    assert label("mutation Ad { __typename }") == ("other", "mutation")
+    assert label("{ __typename }") == ("anonymous", "query")
+
+    assert label("query A { __typename }", persisted=True) == ("A", "query")
+    assert label("query B { __typename }", persisted=True) == ("B", "query")
+    assert label("query C { __typename }", persisted=True) == ("other", "query")
+    assert label("query A { __typename }", persisted=True) == ("A", "query")
+
+
+@pytest.mark.django_db
+def test_metrics_require_staff_or_the_token(client, settings):
+    settings.CRM_METRICS_TOKEN = "s3cret"
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code == 401
+
+    response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+    assert response.status_code == 200
+    assert b"# TYPE crm_graphql_operation_duration_seconds histogram" in response.content
+
+    settings.CRM_METRICS_TOKEN = ""
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code == 401
+    client.force_login(User.objects.create_user("ops", is_staff=True))
+    assert client.get("/metrics").status_code == 200
+
+
+@pytest.mark.django_db
+def test_persisted_operations_are_timed_under_their_name(client, settings):
+    settings.CRM_METRICS_TOKEN = "s3cret"
+    body = {"query": QUERY, "extensions": {"persistedQuery": {"version": 1, "sha256Hash": query_hash(QUERY)}}}
+    client.post("/graphql", json.dumps(body), content_type="application/json")
+    client.post("/graphql", json.dumps({"query": QUERY.replace("Products", "Random123")}), content_type="application/json")
+
+    exposed = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+    assert 'crm_graphql_operation_duration_seconds_count{operation="Products",type="query"}' in exposed
+    assert "Random123" not in exposed
+
+
+@pytest.mark.django_db
+def test_timing_attributes_sql_to_list_and_connection_fields(client, settings):
+    settings.DEBUG = True
+    Product.objects.create(name="Pen", price=1, stock=1)
+    query = "{ allProducts { totalCount edges { node { name } } } products { name } }"
+    response = client.post("/graphql", json.dumps({"query": query}), content_type="application/json", HTTP_X_CRM_TIMING="1")
+
+    timing = response.json()["extensions"]["timing"]
+    fields = timing["fields"]
+    assert fields["Query.allProducts"]["sqlQueries"] == 1
+    assert fields["ProductTypeConnection.totalCount"]["sqlQueries"] == 1
+    # A lazy queryset from a list resolver is evaluated while the field is timed
+    assert fields["Query.products"]["sqlQueries"] == 1
+    assert timing["sqlQueries"] == sum(stats["sqlQueries"] for stats in fields.values())
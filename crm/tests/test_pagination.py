@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from crm.models import Customer, Order
+from crm.schema import schema
+
+PAGE = """
+query Page($first: Int, $after: String, $last: Int, $before: String) {
+  allOrders(first: $first, after: $after, last: $last, before: $before) {
+    edges { node { totalAmount } }
+    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+  }
+}
+"""
+
+
+@pytest.fixture
+def dated_orders(db):
+    customer = Customer.objects.create(name="Pager", email="pager@example.com")
+    now = timezone.now()
+    # Two orders share a date, so pages have to break ties on id
+    dates = [now - timedelta(days=days) for days in (5, 4, 3, 3, 2, 1, 0)]
+    return [Order.objects.create(customer=customer, total_amount=i, order_date=date) for i, date in enumerate(dates)]
+
+
+def page(**variables):
+    result = schema.execute(PAGE, variable_values=variables)
+    assert not result.errors, result.errors
+    connection = result.data["allOrders"]
+    return [float(edge["node"]["totalAmount"]) for edge in connection["edges"]], connection["pageInfo"]
+
+
+def test_forward_pages_follow_order_date_then_id(dated_orders):
+    seen = []
+    after = None
+    while True:
+        amounts, info = page(first=3, after=after)
+        seen.extend(amounts)
+        if not info["hasNextPage"]:
+            break
+        assert amounts
+        after = info["endCursor"]
+    assert seen == [0, 1, 2, 3, 4, 5, 6]
+
+
+def test_backward_pages(dated_orders):
+    amounts, info = page(last=3)
+    assert amounts == [4, 5, 6]
+    assert info["hasPreviousPage"] is True
+    amounts, info = page(last=3, before=info["startCursor"])
+    assert amounts == [1, 2, 3]
+
+
+def test_page_cost_does_not_depend_on_position(dated_orders, django_assert_num_queries):
+    _, info = page(first=5)
+    # A seek on (order_date, id): no OFFSET, one query per page
+    with django_assert_num_queries(1):
+        amounts, _ = page(first=5, after=info["endCursor"])
+    assert amounts == [5, 6]
+
+
+def test_offset_is_rejected(dated_orders):
+    result = schema.execute("{ allOrders(offset: 2, first: 2) { edges { cursor } } }")
+    assert "offset is not supported" in result.errors[0].message
+
+
+def test_invalid_cursor_is_rejected(dated_orders):
+    result = schema.execute(PAGE, variable_values={"first": 2, "after": "bm90IGEgY3Vyc29y"})
+    assert result.errors[0].message.startswith("Invalid cursor")
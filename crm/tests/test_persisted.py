@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from crm.models import Customer
+from crm.persisted import documents, get_document, query_hash
+from crm.schema import schema
+
+QUERY = "{ allCustomers(first: 5) { edges { node { name } } } }"
+
+
+def post(client, body):
+    return client.post("/graphql", json.dumps(body), content_type="application/json")
+
+
+def persisted(sha256):
+    return {"persistedQuery": {"version": 1, "sha256Hash": sha256}}
+
+
+def test_get_document_caches_valid_documents_only():
+    documents.clear()
+    document, errors = get_document(schema.graphql_schema, QUERY)
+    assert errors == []
+    assert get_document(schema.graphql_schema, QUERY)[0] is document
+
+    _, errors = get_document(schema.graphql_schema, "{ noSuchField }")
+    assert errors
+    assert get_document(schema.graphql_schema, "{ noSuchField }")[1]
+
+
+@pytest.mark.django_db
+def test_unknown_hash_asks_for_the_query(client):
+    response = post(client, {"extensions": persisted(query_hash(QUERY))})
+    assert response.json()["errors"][0]["message"] == "PersistedQueryNotFound"
+
+
+@pytest.mark.django_db
+def test_hash_must_match_the_query(client):
+    response = post(client, {"query": QUERY, "extensions": persisted("0" * 64)})
+    assert response.json()["errors"][0]["message"] == "provided sha does not match query"
+
+
+@pytest.mark.django_db
+def test_registered_query_runs_by_hash(client):
+    Customer.objects.create(name="Ada", email="ada@example.com")
+    sha256 = query_hash(QUERY)
+    assert post(client, {"query": QUERY, "extensions": persisted(sha256)}).status_code == 200
+
+    response = post(client, {"extensions": persisted(sha256)})
+    body = response.json()
+    assert body["data"]["allCustomers"]["edges"] == [{"node": {"name": "Ada"}}]
+    assert "cost" in body["extensions"]
+
+
+@pytest.mark.django_db
+def test_mutation_over_get_is_refused(client):
+    response = client.get("/graphql", {"query": 'mutation { createProduct(name: "Pen", price: 1) { product { id } } }'})
+    assert response.status_code == 405
+
+
+@pytest.mark.django_db
+def test_mutation_runs_through_graphene_django(client):
+    response = post(client, {"query": 'mutation { createProduct(name: "Pen", price: 1, stock: 3) { product { name stock } } }'})
+    body = response.json()
+    assert body["data"]["createProduct"]["product"] == {"name": "Pen", "stock": 3}
+    assert "cost" in body["extensions"]
@@ -0,0 +1,43 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from crm.schema import schema
+
+
+def run(query):
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query)
+    assert not result.errors, result.errors
+    return result.data, [query["sql"] for query in queries]
+
+
+def test_list_selects_only_requested_columns(orders):
+    data, sql = run("{ customers { name } }")
+    assert len(data["customers"]) == 3
+    assert len(sql) == 1
+    assert '"crm_customer"."name"' in sql[0]
+    assert '"crm_customer"."email"' not in sql[0]
+
+
+def test_foreign_key_is_joined(orders):
+    data, sql = run("{ orders { totalAmount customer { email } } }")
+    assert {order["customer"]["email"] for order in data["orders"]} == {
+        f"customer{i}@example.com" for i in range(3)
+    }
+    assert len(sql) == 1
+    assert "JOIN" in sql[0]
+
+
+def test_many_to_many_is_prefetched_once(orders):
+    data, sql = run("{ orders { products { name } } }")
+    assert all(len(order["products"]) == 2 for order in data["orders"])
+    assert len(sql) == 2
+
+
+def test_fragments_are_planned(orders):
+    data, sql = run("""
+        { orders { ...OrderFields } }
+        fragment OrderFields on OrderType { customer { name } }
+    """)
+    assert len(data["orders"]) == 6
+    assert len(sql) == 1
@@ -0,0 +1,44 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from crm.models import Customer, DailySales, Order, Product
+from crm.rollups import rebuild_daily_sales
+
+
+@pytest.fixture
+def customers(db):
+    """Ada ordered last week, Bob two years ago, Cy never."""
+    pen = Product.objects.create(name="Pen", price=1, stock=10)
+    ada, bob, cy = (Customer.objects.create(name=name, email=f"{name}@example.com") for name in ("ada", "bob", "cy"))
+    now = timezone.now()
+    for customer, days_ago in ((ada, 7), (ada, 800), (bob, 730), (bob, 731)):
+        Order.objects.create(customer=customer, total_amount=1, order_date=now - timedelta(days=days_ago)).products.add(pen)
+    rebuild_daily_sales()
+    return ada, bob, cy
+
+
+def purge(**options):
+    out = io.StringIO()
+    call_command("purge_inactive_customers", stdout=out, **options)
+    return out.getvalue()
+
+
+def test_dry_run(customers):
+    assert purge(dry_run=True).startswith("Would delete 2 customers and 2 orders.")
+    assert Customer.objects.count() == 3
+
+
+def test_purge_deletes_inactive_customers_in_batches(customers, django_capture_on_commit_callbacks):
+    ada, bob, cy = customers
+    with django_capture_on_commit_callbacks(execute=True):
+        output = purge(batch_size=1)
+
+    assert output.startswith("Deleted 2 customers and 2 orders in 2 batches")
+    assert list(Customer.objects.all()) == [ada]
+    assert Order.objects.count() == Order.products.through.objects.count() == 2
+    # The purged orders' days left the rollup
+    assert DailySales.objects.count() == 2
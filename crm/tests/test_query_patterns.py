@@ -0,0 +1,78 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from crm.models import Customer, Product
+from crm.query_patterns import NPlusOneError, detect_queries, n_plus_one_detected, normalize_sql
+
+
+def test_normalize_sql_keeps_only_the_shape():
+    assert normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x''y'") == (
+        "SELECT * FROM t WHERE id IN (...) AND name = ?"
+    )
+    assert normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == "INSERT INTO t (a, b) VALUES (?, ?)"
+
+
+@pytest.mark.django_db
+def test_strict_mode_raises_on_repeated_selects(settings):
+    settings.CRM_NPLUSONE_THRESHOLD = 3
+    products = [Product.objects.create(name=f"P{i}", price=1, stock=1) for i in range(3)]
+    with pytest.raises(NPlusOneError, match="3x SELECT"):
+        with detect_queries("Loop", mode="strict"):
+            for product in products:
+                Product.objects.get(pk=product.pk)
+
+
+@pytest.mark.django_db
+def test_writes_and_transaction_control_are_not_flagged(settings):
+    settings.CRM_NPLUSONE_THRESHOLD = 2
+    with detect_queries("Import", mode="strict") as detector:
+        Customer.objects.bulk_create(
+            [Customer(name=f"C{i}", email=f"c{i}@example.com") for i in range(4)], batch_size=1
+        )
+    assert detector.queries == {}
+
+
+@pytest.mark.django_db
+def test_view_reports_findings_in_extensions(client, settings, monkeypatch):
+    monkeypatch.setattr(n_plus_one_detected, "_series", {})
+    settings.CRM_NPLUSONE_MODE = "strict"
+    settings.CRM_NPLUSONE_THRESHOLD = 3
+    Product.objects.create(name="Pen", price=1, stock=1)
+    page = "allProducts(first: 1) { edges { node { name } } }"
+    query = f"{{ a: {page} b: {page} c: {page} }}"
+
+    response = client.post("/graphql", json.dumps({"query": query}), content_type="application/json")
+    body = response.json()
+    assert response.status_code == 200
+    assert body["data"]["c"]["edges"] == [{"node": {"name": "Pen"}}]
+    (finding,) = body["extensions"]["nPlusOne"]
+    assert finding["count"] == 3 and finding["statement"].startswith("SELECT")
+    assert finding["paths"] == {"a": 1, "b": 1, "c": 1}
+    # The metric is labelled by schema coordinate, never by client aliases
+    assert n_plus_one_detected._series == {("anonymous", "Query.allProducts"): 3}
+
+
+@pytest.mark.django_db
+def test_committed_mutation_is_not_turned_into_an_error(client, settings):
+    settings.CRM_NPLUSONE_MODE = "strict"
+    settings.CRM_NPLUSONE_THRESHOLD = 2
+    mutation = """mutation {
+      bulkCreateCustomers(batchSize: 1, input: [
+        {name: "A", email: "a@example.com"}, {name: "B", email: "b@example.com"}, {name: "C", email: "c@example.com"}
+      ]) { customers { id } }
+    }"""
+
+    response = client.post("/graphql", json.dumps({"query": mutation}), content_type="application/json")
+    assert response.status_code == 200
+    body = response.json()
+    assert "errors" not in body and "nPlusOne" not in body["extensions"]
+    assert Customer.objects.count() == 3
+
+
+def test_check_command(orders):
+    out = io.StringIO()
+    call_command("check_n_plus_one", first=5, stdout=out)
+    assert "No repeated statements found." in out.getvalue()
@@ -0,0 +1,83 @@
+import pytest
+
+from crm.models import Customer, Order, ReminderCheckpoint
+from crm.reminders import ReminderSender, send_order_reminders
+
+
+class RecordingSender(ReminderSender):
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+
+    def send(self, reminder):
+        if reminder.email in self.fail:
+            raise ConnectionError(reminder.email)
+        self.sent.append((reminder.email, sorted(reminder.order_ids)))
+
+
+@pytest.fixture
+def pending(db):
+    """Four customers, one pending order each, plus a second order for the first customer."""
+    customers = [Customer.objects.create(name=f"C{i}", email=f"c{i}@example.com") for i in range(4)]
+    orders = [Order.objects.create(customer=customer, total_amount=1) for customer in customers]
+    orders.append(Order.objects.create(customer=customers[0], total_amount=1))
+    Order.objects.create(customer=customers[1], total_amount=1, status=Order.STATUS_COMPLETED)
+    return orders
+
+
+def run(sender, **kwargs):
+    kwargs.setdefault("page_size", 10)
+    return send_order_reminders(sender=sender, workers=2, rate=0, **kwargs)
+
+
+def test_one_reminder_per_customer_with_order_pks(pending):
+    sender = RecordingSender()
+    stats = run(sender)
+
+    assert sorted(sender.sent) == [
+        ("c0@example.com", sorted([pending[0].pk, pending[4].pk])),
+        ("c1@example.com", [pending[1].pk]),
+        ("c2@example.com", [pending[2].pk]),
+        ("c3@example.com", [pending[3].pk]),
+    ]
+    assert (stats.orders, stats.sent, stats.failed) == (5, 4, 0)
+
+
+def test_retry_after_a_partial_page_skips_delivered_orders(pending):
+    sender = RecordingSender(fail={"c2@example.com"})
+    stats = run(sender)
+    assert (stats.sent, stats.failed) == (3, 1)
+    checkpoint = ReminderCheckpoint.objects.get(name="order_reminders")
+    assert checkpoint.cursor == ""
+    assert sorted(checkpoint.sent_order_ids) == sorted(o.pk for o in pending if o.customer.email != "c2@example.com")
+
+    retry = RecordingSender()
+    run(retry)
+    assert retry.sent == [("c2@example.com", [pending[2].pk])]
+    checkpoint.refresh_from_db()
+    assert checkpoint.cursor and checkpoint.sent_order_ids == []
+
+
+def test_each_page_reminds_about_its_own_orders(pending):
+    sender = RecordingSender()
+    stats = run(sender, page_size=2)
+    # c0's second order sits on the last page and gets a reminder of its own
+    assert sender.sent[-1] == ("c0@example.com", [pending[4].pk])
+    assert (stats.pages, stats.sent, stats.duplicates) == (3, 5, 0)
+
+
+def test_restart_reminds_about_each_order_once(pending):
+    # Pages of two: (c0, c1), (c2, c3), (c0's second order)
+    first = RecordingSender(fail={"c3@example.com"})
+    run(first, page_size=2)
+    retry = RecordingSender()
+    run(retry, page_size=2)
+
+    reminded = [pk for _, pks in first.sent + retry.sent for pk in pks]
+    assert sorted(reminded) == sorted(o.pk for o in pending)
+    assert retry.sent == [("c3@example.com", [pending[3].pk]), ("c0@example.com", [pending[4].pk])]
+
+
+def test_sender_must_implement_send():
+    with pytest.raises(TypeError):
+        ReminderSender()
@@ -0,0 +1,35 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from crm.models import Customer, Order
+from crm.reports import crm_stats
+from crm.schema import schema
+
+
+def test_totals_in_one_query(db, django_assert_num_queries):
+    now = timezone.now()
+    alice = Customer.objects.create(name="Alice", email="alice@example.com")
+    Customer.objects.create(name="Bob", email="bob@example.com")
+    Order.objects.create(customer=alice, total_amount=Decimal("10.50"))
+    old = Order.objects.create(customer=alice, total_amount=Decimal("4.50"))
+    Order.objects.filter(pk=old.pk).update(order_date=now - timedelta(days=30))
+
+    with django_assert_num_queries(1):
+        stats = crm_stats()
+    assert stats == {"customer_count": 2, "order_count": 2, "revenue": Decimal("15.00")}
+
+    recent = crm_stats(date_from=now - timedelta(days=1))
+    assert recent == {"customer_count": 2, "order_count": 1, "revenue": Decimal("10.50")}
+
+
+def test_empty_database_reports_zero_revenue(db):
+    assert crm_stats() == {"customer_count": 0, "order_count": 0, "revenue": Decimal("0")}
+
+
+def test_crm_stats_query(orders):
+    Order.objects.update(total_amount=Decimal("2.00"))
+    result = schema.execute("{ crmStats { customerCount orderCount revenue } }")
+    assert not result.errors
+    assert result.data["crmStats"] == {"customerCount": 3, "orderCount": 6, "revenue": "12"}
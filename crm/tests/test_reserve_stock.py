@@ -0,0 +1,62 @@
+import io
+from unittest import mock
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import transaction
+
+from crm.models import Product
+from crm.stock import reserve_stock
+
+
+@pytest.fixture
+def products(db):
+    return [Product.objects.create(name=f"P{i}", price=1, stock=stock) for i, stock in enumerate((2, 1, 0))]
+
+
+def stock(products):
+    return [product.stock for product in Product.objects.filter(pk__in=[p.pk for p in products]).order_by("pk")]
+
+
+def test_reserves_one_unit_of_each(products):
+    reserved = reserve_stock([products[1].pk, products[0].pk, products[0].pk])
+    assert sorted((p.pk, p.stock) for p in reserved) == [(products[0].pk, 1), (products[1].pk, 0)]
+    assert stock(products) == [1, 0, 0]
+
+
+def test_sold_out_reserves_nothing(products):
+    with pytest.raises(ValidationError, match=f"'Insufficient stock for product IDs: {products[2].pk}'"):
+        reserve_stock([products[0].pk, products[2].pk])
+    assert stock(products) == [2, 1, 0]
+
+
+def test_cache_invalidation_waits_for_the_commit(products, django_capture_on_commit_callbacks):
+    with mock.patch("crm.signals.invalidate_model_counts") as invalidate:
+        with django_capture_on_commit_callbacks(execute=True):
+            with transaction.atomic():
+                reserve_stock([products[0].pk])
+                invalidate.assert_not_called()
+    invalidate.assert_called_once()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_orders_never_oversell():
+    out = io.StringIO()
+    call_command("stress_create_order", threads=4, attempts=10, products=3, per_order=2, stock=8, stdout=out)
+    output = out.getvalue()
+    assert "Stock check passed" in output, output
+    assert ", 0 failed" in output, output
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_idempotent_orders():
+    # Every order also stores its response under its idempotencyKey
+    out = io.StringIO()
+    call_command(
+        "stress_create_order", threads=4, attempts=10, products=3, per_order=2, stock=8, idempotency_keys=True, stdout=out,
+    )
+    output = out.getvalue()
+    assert "Stock check passed" in output, output
+    assert "Idempotency check passed" in output, output
+    assert ", 0 failed" in output, output
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+from django.db import transaction
+
+from crm.models import Product
+from crm.response_cache import ResponseCache
+
+QUERY = "{ allProducts(first: 5) { edges { node { name } } } }"
+
+
+@pytest.fixture
+def response_cache(settings):
+    settings.CRM_RESPONSE_CACHE_ENABLED = True
+    return ResponseCache(settings.CRM_RESPONSE_CACHE)
+
+
+def run(client):
+    body = client.post("/graphql", json.dumps({"query": QUERY}), content_type="application/json").json()
+    return body["extensions"]["cache"], [edge["node"]["name"] for edge in body["data"]["allProducts"]["edges"]]
+
+
+@pytest.mark.django_db
+def test_queries_are_cached_until_a_read_table_changes(client, response_cache, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(name="Pen", price=1, stock=3)
+
+    assert run(client) == ("MISS", ["Pen"])
+    assert run(client) == ("HIT", ["Pen"])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(name="Ink", price=2, stock=3)
+    assert run(client) == ("MISS", ["Pen", "Ink"])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_generations_move_only_when_the_write_commits(response_cache):
+    table = Product._meta.db_table
+    before = response_cache.generations([table])[table]
+
+    with transaction.atomic():
+        Product.objects.create(name="Pen", price=1, stock=3)
+        # A reader caching now would tag the old rows with the old generation
+        assert response_cache.generations([table])[table] == before
+    assert response_cache.generations([table])[table] == before + 1
+
+    with pytest.raises(RuntimeError), transaction.atomic():
+        Product.objects.create(name="Ink", price=2, stock=3)
+        raise RuntimeError
+    assert response_cache.generations([table])[table] == before + 1
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from crm.models import Customer, DailySales, Order
+from crm.rollups import rebuild_daily_sales, sales_by_day
+
+
+@pytest.fixture
+def customer(db):
+    return Customer.objects.create(name="Ada", email="ada@example.com")
+
+
+def place(customer, amount, days_ago=0):
+    return Order.objects.create(customer=customer, total_amount=amount, order_date=timezone.now() - timedelta(days=days_ago))
+
+
+def totals(day):
+    row = DailySales.objects.get(date=day)
+    return row.order_count, row.revenue, row.customer_count
+
+
+def test_orders_are_added_to_their_day_on_commit(customer, django_capture_on_commit_callbacks):
+    other = Customer.objects.create(name="Bob", email="bob@example.com")
+    for buyer, amount in ((customer, 10), (customer, 5), (other, 1)):
+        with django_capture_on_commit_callbacks(execute=True):
+            place(buyer, amount)
+
+    assert totals(timezone.localdate()) == (3, 16, 2)
+
+
+def test_first_orders_committed_together_undercount_until_rebuilt(customer, django_capture_on_commit_callbacks):
+    # Both orders are in before either is recorded, so each sees the other as an earlier order
+    with django_capture_on_commit_callbacks(execute=True):
+        place(customer, 10)
+        place(customer, 5)
+    assert totals(timezone.localdate()) == (2, 15, 0)
+
+    rebuild_daily_sales()
+    assert totals(timezone.localdate()) == (2, 15, 1)
+
+
+def test_cascade_delete_refreshes_each_day_once(customer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        for days_ago in (0, 0, 0, 1, 1):
+            place(customer, 10, days_ago)
+
+    with mock.patch("crm.signals.refresh_days") as refresh, django_capture_on_commit_callbacks(execute=True):
+        customer.delete()
+    refresh.assert_called_once()
+    assert refresh.call_args.args[0] == {timezone.localdate(), timezone.localdate() - timedelta(days=1)}
+
+
+def test_rebuild_and_sales_by_day(customer):
+    place(customer, 10, days_ago=2)
+    place(customer, 5)
+    DailySales.objects.create(date=timezone.localdate() - timedelta(days=5), order_count=9)
+
+    assert rebuild_daily_sales() == 2
+    today = timezone.localdate()
+    rows = sales_by_day(today - timedelta(days=2), today)
+    assert [(row.order_count, row.revenue) for row in rows] == [(1, 10), (0, 0), (1, 5)]
@@ -0,0 +1,55 @@
+import pytest
+from django.db.models import OuterRef, Subquery
+
+from crm.models import Customer, Order, Product
+from crm.schema import schema
+from crm.search import RANK_ANNOTATION, search
+
+
+@pytest.fixture
+def customers(db):
+    return [
+        Customer.objects.create(name=name, email=email)
+        for name, email in [
+            ("Ada Lovelace", "ada@example.com"),
+            ("Grace Hopper", "grace@navy.example.com"),
+            ("Alan Turing", "alan@lovelace.example.com"),
+        ]
+    ]
+
+
+def names(queryset):
+    return sorted(customer.name for customer in queryset)
+
+
+def test_search_matches_substrings_case_insensitively(customers):
+    assert names(search(Customer.objects.all(), "LOVE")) == ["Ada Lovelace", "Alan Turing"]
+    assert names(search(Customer.objects.all(), "love", fields=["name"])) == ["Ada Lovelace"]
+    assert names(search(Customer.objects.all(), "hop")) == ["Grace Hopper"]
+
+
+def test_short_terms_fall_back_to_icontains(customers):
+    assert names(search(Customer.objects.all(), "Tu")) == ["Alan Turing"]
+
+
+def test_index_follows_updates(customers):
+    Customer.objects.filter(pk=customers[1].pk).update(name="Grace Brewster")
+    assert names(search(Customer.objects.all(), "hopper")) == []
+    assert names(search(Customer.objects.all(), "brewster")) == ["Grace Brewster"]
+
+
+def test_search_products_connection(db):
+    for name in ("Fountain pen", "Pencil", "Ink"):
+        Product.objects.create(name=name, price=1, stock=1)
+
+    result = schema.execute('{ searchProducts(query: "pen") { edges { node { name } } } }')
+    assert result.errors is None
+    assert sorted(edge["node"]["name"] for edge in result.data["searchProducts"]["edges"]) == ["Fountain pen", "Pencil"]
+
+
+def test_rank_correlates_inside_a_subquery(customers):
+    order = Order.objects.create(customer=customers[0], total_amount=1)
+    # The subquery aliases crm_customer, so the rank must not name the table itself
+    ranked = search(Customer.objects.all(), "lovelace", rank=True).filter(pk=OuterRef("customer_id"))
+    order = Order.objects.annotate(rank=Subquery(ranked.values(RANK_ANNOTATION)[:1])).get(pk=order.pk)
+    assert order.rank is not None
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.db.models import QuerySet
+
+from crm.models import Product
+from crm.schema import schema
+from crm.stock import restock_low_stock
+
+RESTOCK = """
+mutation { updateLowStockProducts(threshold: 10, increment: 5) { success message updatedProducts { name stock } } }
+"""
+
+
+def make_products(*stocks):
+    return [Product.objects.create(name=f"Product {i}", price=1, stock=stock) for i, stock in enumerate(stocks)]
+
+
+def test_restocks_only_products_below_threshold(db):
+    products = make_products(0, 9, 10, 50)
+    updated = restock_low_stock(threshold=10, increment=10, chunk_size=2)
+    assert sorted(p.pk for p in updated) == [products[0].pk, products[1].pk]
+    assert [p.stock for p in Product.objects.order_by("pk")] == [10, 19, 10, 50]
+
+
+def test_restock_is_one_update_per_chunk(db, django_assert_num_queries):
+    make_products(*[1] * 6)
+    # Bounds, then per chunk: SAVEPOINT, lock, UPDATE, re-read, RELEASE
+    with django_assert_num_queries(1 + 3 * 5):
+        restock_low_stock(threshold=10, increment=1, chunk_size=2)
+
+
+def test_restock_returns_only_rows_it_updated(db):
+    products = make_products(1, 50, 1)
+    select_for_update = QuerySet.select_for_update
+    stale = []
+
+    def lock(queryset, *args, **kwargs):
+        # The first lock reads a stale snapshot in which product 1 still looks low
+        if not stale:
+            stale.append(queryset)
+            queryset = Product.objects.filter(pk__in=[p.pk for p in products])
+        return select_for_update(queryset, *args, **kwargs)
+
+    with mock.patch.object(QuerySet, "select_for_update", lock):
+        updated = restock_low_stock(threshold=10, increment=10)
+
+    assert [p.pk for p in updated] == [products[0].pk, products[2].pk]
+    assert [p.stock for p in Product.objects.order_by("pk")] == [11, 50, 11]
+
+
+def test_restock_limited_to_product_ids(db):
+    products = make_products(1, 1)
+    restock_low_stock(product_ids=[products[1].pk])
+    assert [p.stock for p in Product.objects.order_by("pk")] == [1, 11]
+
+
+def test_update_low_stock_products_mutation(db, django_capture_on_commit_callbacks):
+    make_products(3, 30)
+    count = "{ allProducts(stock_Lte: 5) { totalCount } }"
+    assert schema.execute(count).data["allProducts"]["totalCount"] == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        result = schema.execute(RESTOCK)
+    assert not result.errors
+    payload = result.data["updateLowStockProducts"]
+    assert payload["success"] is True
+    assert payload["updatedProducts"] == [{"name": "Product 0", "stock": 8}]
+    # The UPDATE skips post_save, so the cached count has to be expired explicitly
+    assert schema.execute(count).data["allProducts"]["totalCount"] == 0
+
+
+def test_update_low_stock_products_rejects_non_positive_increment(db):
+    result = schema.execute("mutation { updateLowStockProducts(increment: 0) { success } }")
+    assert result.errors[0].message == "Increment must be positive."
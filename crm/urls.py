@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from .views import AsyncCRMGraphQLView, CRMGraphQLView, ExportView, MetricsView
+
+GraphQLViewClass = AsyncCRMGraphQLView if getattr(settings, "CRM_ASYNC_GRAPHQL", False) else CRMGraphQLView
+
+urlpatterns = [
+    path("graphql", csrf_exempt(GraphQLViewClass.as_view(graphiql=True))),
+    path("export/<str:resource>", ExportView.as_view(), name="crm-export"),
+    path("metrics", MetricsView.as_view(), name="crm-metrics"),
+]
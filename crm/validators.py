@@ -0,0 +1,19 @@
+import re
+
+from django.core.exceptions import ValidationError
+
+
+# Shared by the create mutations and the crm_import command
+PHONE_PATTERN = re.compile(r"^\+?\d{7,15}$|^\d{3}-\d{3}-\d{4}$")
+
+
+def validate_phone(phone):
+    if phone and not PHONE_PATTERN.match(phone):
+        raise ValidationError(f"Invalid phone format: {phone}")
+
+
+def validate_product(price, stock):
+    if price <= 0:
+        raise ValidationError("Price must be positive.")
+    if stock < 0:
+        raise ValidationError("Stock cannot be negative.")
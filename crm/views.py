@@ -0,0 +1,357 @@
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+from inspect import isawaitable
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.views import View
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, MiddlewareManager, OperationType, execute, get_operation_ast
+from graphql.error import GraphQLError
+
+from .async_execution import ConcurrentExecutionContext, run_orm
+from .auth import staff_or_bearer, unauthorized
+from .complexity import QueryTooExpensive, check_query_cost
+from .exports import EXPORTS, export_rows, iter_csv, iter_ndjson
+from .metrics import debug_requested, metrics_allowed, observe_operation, operation_label, registry
+from .persisted import get_document, load_persisted_query, query_hash, save_persisted_query
+from .query_patterns import detect_queries
+from .response_cache import crm_tables, get_response_cache, get_viewer, track_tables
+
+
+class PreparedOperation(namedtuple("PreparedOperation", [
+    "schema", "document", "operation_ast", "query", "sha256", "variables", "operation_name", "cost",
+])):
+    @property
+    def is_query(self):
+        return self.operation_ast is not None and self.operation_ast.operation == OperationType.QUERY
+
+
+class CRMGraphQLView(GraphQLView):
+    """
+    GraphQLView with automatic persisted queries (Apollo APQ protocol) and a
+    parsed-document LRU, so repeated operations skip parse and validate.
+    Operations are cost-checked before execution; the report is returned in
+    the response `extensions`. Queries go through the response cache when
+    CRM_RESPONSE_CACHE_ENABLED is set. Executions are timed (crm/metrics.py);
+    per-resolver timings are sampled and returned in `extensions.timing` when
+    the debug header is sent. Operations are also watched for N+1 queries
+    (CRM_NPLUSONE_MODE).
+    """
+
+    def json_encode(self, request, d, pretty=False):
+        # graphene-django's get_response() leaves out the result's `extensions`
+        # (cost, cache, timing); execute_graphql_request() kept them for here
+        extensions = request.__dict__.pop("crm_extensions", None)
+        if extensions:
+            d = {**d, "extensions": extensions}
+        return super().json_encode(request, d, pretty)
+
+    @staticmethod
+    def keep_extensions(request, result):
+        request.crm_extensions = getattr(result, "extensions", None)
+        return result
+
+    @staticmethod
+    def get_persisted_query(request, data):
+        extensions = data.get("extensions") or request.GET.get("extensions")
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions must be valid JSON."))
+        if not isinstance(extensions, dict):
+            return None
+        persisted = extensions.get("persistedQuery")
+        if isinstance(persisted, dict) and persisted.get("sha256Hash"):
+            return persisted["sha256Hash"]
+        return None
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        prepared = self.prepare_operation(request, data, query, variables, operation_name, show_graphiql)
+        if isinstance(prepared, PreparedOperation):
+            prepared = self.execute_prepared(request, prepared)
+        return self.keep_extensions(request, prepared)
+
+    def execute_prepared(self, request, prepared):
+        response_cache = get_response_cache()
+        if response_cache is None or not prepared.is_query:
+            result = self.execute_document(request, prepared)
+            result.extensions = {**(result.extensions or {}), "cost": prepared.cost}
+            return result
+
+        key = self.response_cache_key(request, response_cache, prepared)
+        data = response_cache.get(key)
+        if data is not None:
+            return ExecutionResult(data=data, extensions={"cost": prepared.cost, "cache": "HIT"})
+
+        # Snapshot generations before executing so a concurrent write can't be cached as fresh
+        generations = response_cache.generations(crm_tables())
+        with track_tables() as tables:
+            result = self.execute_document(request, prepared)
+        if not result.errors:
+            response_cache.set(key, result.data, {table: generations[table] for table in tables})
+        result.extensions = {**(result.extensions or {}), "cost": prepared.cost, "cache": "MISS"}
+        return result
+
+    def prepare_operation(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """
+        Resolves persisted queries, parses/validates (through the document cache)
+        and cost-checks the operation. Returns a PreparedOperation, or the
+        ExecutionResult / None to respond with instead.
+        """
+        sha256 = self.get_persisted_query(request, data)
+        if sha256:
+            if query:
+                if query_hash(query) != sha256:
+                    return ExecutionResult(errors=[GraphQLError("provided sha does not match query")])
+                save_persisted_query(sha256, query)
+            else:
+                query = load_persisted_query(sha256)
+                if query is None:
+                    return ExecutionResult(errors=[GraphQLError(
+                        "PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"}
+                    )])
+
+        schema = self.schema.graphql_schema
+        document, errors = get_document(schema, query, self.validation_rules, key=sha256) if query else (None, [])
+        operation_ast = get_operation_ast(document, operation_name) if document else None
+        if not query or (
+            request.method.lower() == "get" and operation_ast is not None and operation_ast.operation != OperationType.QUERY
+        ):
+            # graphene-django answers these: no query, or a mutation over GET
+            return super().execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        try:
+            cost = check_query_cost(schema, document, operation_name, variables)
+        except QueryTooExpensive as e:
+            report = {k: v for k, v in e.extensions.items() if k != "code"}
+            return ExecutionResult(data=None, errors=[e], extensions={"cost": report})
+
+        return PreparedOperation(
+            schema, document, operation_ast, query, sha256, variables, operation_name, cost
+        )
+
+    @staticmethod
+    def response_cache_key(request, response_cache, prepared):
+        return response_cache.make_key(
+            prepared.sha256 or query_hash(prepared.query), prepared.variables,
+            prepared.operation_name, get_viewer(request),
+        )
+
+    def get_middleware(self, request):
+        """graphene-django's middleware plus the running operation's instruments (see instrument())."""
+        middleware = super().get_middleware(request)
+        instruments = [instrument for instrument in getattr(request, "crm_instruments", ()) if instrument is not None]
+        if not instruments:
+            return middleware
+        if isinstance(middleware, MiddlewareManager):
+            middleware = middleware.middlewares
+        return [*(middleware or []), *instruments]
+
+    def execute_options(self, request, prepared):
+        options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": prepared.variables,
+            "operation_name": prepared.operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            options["execution_context_class"] = self.execution_context_class
+        return options
+
+    @contextmanager
+    def instrument(self, request, prepared):
+        """
+        Times the operation (crm/metrics.py) and watches it for N+1 queries
+        (crm/query_patterns.py). Yields (timing, detector), each None when
+        the operation isn't sampled or watched.
+        """
+        persisted = bool(prepared.sha256)
+        name, _ = operation_label(prepared.operation_ast, prepared.operation_name, persisted)
+        with observe_operation(request, prepared.operation_ast, prepared.operation_name, persisted) as timing:
+            # Never raise here: a mutation has committed by the time the detector reports
+            with detect_queries(name, raise_errors=False) as detector:
+                request.crm_instruments = (timing, detector)
+                try:
+                    yield timing, detector
+                finally:
+                    del request.crm_instruments
+
+    @staticmethod
+    def add_instrument_extensions(request, result, timing, detector):
+        """
+        Adds `timing` when the request carried the debug header, and `nPlusOne`
+        when strict N+1 detection flagged the operation.
+        """
+        extensions = {}
+        if timing is not None and debug_requested(request):
+            extensions["timing"] = timing.extensions()
+        if detector is not None and detector.findings:
+            extensions["nPlusOne"] = [query.as_dict() for query in detector.findings]
+        if extensions:
+            result.extensions = {**(result.extensions or {}), **extensions}
+        return result
+
+    def execute_document(self, request, prepared):
+        with self.instrument(request, prepared) as (timing, detector):
+            if prepared.is_query:
+                try:
+                    result = execute(prepared.schema, prepared.document, **self.execute_options(request, prepared))
+                except Exception as e:
+                    result = ExecutionResult(errors=[e])
+            else:
+                # Mutations go through graphene-django as is (ATOMIC_MUTATIONS and all);
+                # they aren't cached, so parsing them again costs little next to their writes
+                result = super().execute_graphql_request(
+                    request, {}, prepared.query, prepared.variables, prepared.operation_name
+                )
+        return self.add_instrument_extensions(request, result, timing, detector)
+
+
+class AsyncCRMGraphQLView(CRMGraphQLView):
+    """
+    CRMGraphQLView for ASGI (crm/asgi.py). Queries execute asynchronously:
+    each root field resolves on the bounded ORM pool, so independent root
+    fields run concurrently and a slow one holds a pool thread instead of the
+    whole request. Mutations run on a single pool thread inside their transaction.
+    """
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                # Rendering the GraphiQL page doesn't touch the database
+                return super().dispatch(request, *args, **kwargs)
+
+            if self.batch:
+                responses = [await self.get_response_async(request, entry) for entry in data]
+                result = "[{}]".format(",".join([response[0] for response in responses]))
+                status_code = responses and max(responses, key=lambda response: response[1])[1] or 200
+            else:
+                result, status_code = await self.get_response_async(request, data)
+
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    async def get_response_async(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        request.crm_result = await self.execute_graphql_request_async(
+            request, data, query, variables, operation_name
+        )
+        # graphene-django builds the response from the result (see execute_graphql_request)
+        return self.get_response(request, data)
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        # Called by get_response() with the result get_response_async() awaited
+        return self.keep_extensions(request, request.__dict__.pop("crm_result"))
+
+    async def execute_graphql_request_async(self, request, data, query, variables, operation_name):
+        # The persisted queries and the response cache can live in a network cache
+        # (Redis, Memcached) whose calls block, so they run on the ORM pool as well
+        prepared = await run_orm(self.prepare_operation, request, data, query, variables, operation_name)
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+
+        response_cache = get_response_cache()
+        if response_cache is None or not prepared.is_query:
+            result = await self.execute_document_async(request, prepared)
+            result.extensions = {**(result.extensions or {}), "cost": prepared.cost}
+            return result
+
+        key = self.response_cache_key(request, response_cache, prepared)
+        data = await run_orm(response_cache.get, key)
+        if data is not None:
+            return ExecutionResult(data=data, extensions={"cost": prepared.cost, "cache": "HIT"})
+
+        generations = await run_orm(response_cache.generations, crm_tables())
+        # The pool threads join this tracking through the copied context
+        with track_tables() as tables:
+            result = await self.execute_document_async(request, prepared)
+        if not result.errors:
+            await run_orm(response_cache.set, key, result.data, {table: generations[table] for table in tables})
+        result.extensions = {**(result.extensions or {}), "cost": prepared.cost, "cache": "MISS"}
+        return result
+
+    async def execute_document_async(self, request, prepared):
+        if not prepared.is_query:
+            return await run_orm(self.execute_document, request, prepared)
+        # The pool threads join the timing and N+1 detection through the copied context
+        with self.instrument(request, prepared) as (timing, detector):
+            try:
+                execute_options = self.execute_options(request, prepared)
+                execute_options["execution_context_class"] = ConcurrentExecutionContext
+                result = execute(prepared.schema, prepared.document, **execute_options)
+                if isawaitable(result):
+                    result = await result
+            except Exception as e:
+                result = ExecutionResult(errors=[e])
+        return self.add_instrument_extensions(request, result, timing, detector)
+
+
+class MetricsView(View):
+    """
+    Prometheus text exposition of the GraphQL metrics collected by this process
+    (crm/metrics.py), for staff users and scrapers sending CRM_METRICS_TOKEN.
+    """
+
+    def get(self, request):
+        if not metrics_allowed(request):
+            return unauthorized("metrics")
+        return HttpResponse(registry.expose(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ExportView(View):
+    """
+    Streams every order or customer matching the OrderFilter/CustomerFilter
+    query parameters as NDJSON (default) or CSV (?format=csv), one chunk at a time.
+    Staff users and callers sending CRM_EXPORT_TOKEN only: the rows hold emails and phones.
+    """
+
+    content_types = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+    def get(self, request, resource):
+        if not staff_or_bearer(request, getattr(settings, "CRM_EXPORT_TOKEN", "")):
+            return unauthorized("export")
+        if resource not in EXPORTS:
+            raise Http404(f"Unknown export: {resource}")
+        export_format = request.GET.get("format", "ndjson")
+        if export_format not in self.content_types:
+            return HttpResponseBadRequest("format must be one of: ndjson, csv.")
+
+        model, filterset_class, _, columns = EXPORTS[resource]
+        filterset = filterset_class(request.GET, queryset=model.objects.all())
+        if not filterset.is_valid():
+            return JsonResponse({"errors": filterset.errors}, status=400)
+
+        rows = export_rows(resource, filterset.qs)
+        content = iter_csv(rows, columns) if export_format == "csv" else iter_ndjson(rows)
+        response = StreamingHttpResponse(content, content_type=self.content_types[export_format])
+        response["Content-Disposition"] = f'attachment; filename="{resource}.{export_format}"'
+        return response